@@ -0,0 +1,185 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional
+
+
+class CacheBackend(ABC):
+    """Interfaz común para los backends de caché de respuestas"""
+
+    def __init__(self, ttl: Optional[int] = None):
+        """
+        :param ttl: segundos de validez de cada entrada (None = sin vencimiento)
+        """
+        self.ttl = ttl
+        self.version = "0"
+
+    def set_version(self, version: str):
+        """Cambia el espacio de claves (ej: al cargar un índice nuevo)"""
+        self.version = str(version)
+
+    def make_key(self, question: str) -> str:
+        """Clave normalizada y acotada a la versión del índice"""
+        return f"{self.version}:{question.lower().strip()}"
+
+    @abstractmethod
+    def get(self, question: str) -> Optional[dict]:
+        """Resultado guardado para la pregunta, o None si no está o venció"""
+
+    @abstractmethod
+    def set(self, question: str, result: dict, ttl: Optional[int] = None):
+        """Guarda un resultado; `ttl` reemplaza al TTL por defecto para esta entrada"""
+
+    @abstractmethod
+    def clear(self):
+        """Elimina todas las entradas"""
+
+    def __contains__(self, question: str) -> bool:
+        return self.get(question) is not None
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """Cantidad de entradas guardadas"""
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Caché LRU en memoria, local al proceso"""
+
+    def __init__(self, max_size: int = 100, ttl: Optional[int] = None):
+        super().__init__(ttl)
+        self.max_size = max_size
+        self._data: OrderedDict[str, tuple] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, question: str) -> Optional[dict]:
+        key = self.make_key(question)
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, payload = entry
+            if expires_at is not None and expires_at < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return json.loads(payload)
+
+    def set(self, question: str, result: dict, ttl: Optional[int] = None):
+        key = self.make_key(question)
+        ttl = ttl or self.ttl
+        expires_at = time.time() + ttl if ttl else None
+        payload = json.dumps(result, ensure_ascii=False, default=str)
+        with self._lock:
+            self._data[key] = (expires_at, payload)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """Caché compartida entre procesos en un archivo SQLite (ej: vector_store/query_cache.sqlite)"""
+
+    def __init__(self, path: str, max_size: int = 10000, ttl: Optional[int] = None):
+        super().__init__(ttl)
+        self.path = path
+        self.max_size = max_size
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS query_cache ("
+                " key TEXT PRIMARY KEY,"
+                " payload TEXT NOT NULL,"
+                " expires_at REAL,"
+                " last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON query_cache(last_access)")
+
+    def _connection(self) -> sqlite3.Connection:
+        """Una conexión por hilo; WAL permite lectores concurrentes de varios procesos"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, question: str) -> Optional[dict]:
+        key = self.make_key(question)
+        now = time.time()
+        try:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT payload, expires_at FROM query_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            payload, expires_at = row
+            if expires_at is not None and expires_at < now:
+                conn.execute("DELETE FROM query_cache WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE query_cache SET last_access = ? WHERE key = ?", (now, key))
+            return json.loads(payload)
+        except sqlite3.Error as e:
+            print(f"[ERROR] Caché SQLite (lectura): {e}")
+            return None
+
+    def set(self, question: str, result: dict, ttl: Optional[int] = None):
+        key = self.make_key(question)
+        now = time.time()
+        ttl = ttl or self.ttl
+        expires_at = now + ttl if ttl else None
+        payload = json.dumps(result, ensure_ascii=False, default=str)
+        try:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO query_cache (key, payload, expires_at, last_access)"
+                " VALUES (?, ?, ?, ?)",
+                (key, payload, expires_at, now)
+            )
+            self._evict(conn, now)
+        except sqlite3.Error as e:
+            print(f"[ERROR] Caché SQLite (escritura): {e}")
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        """Elimina vencidas y las menos usadas por encima de max_size"""
+        conn.execute("DELETE FROM query_cache WHERE expires_at IS NOT NULL AND expires_at < ?", (now,))
+        conn.execute(
+            "DELETE FROM query_cache WHERE key IN ("
+            " SELECT key FROM query_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+            (self.max_size,)
+        )
+
+    def clear(self):
+        self._connection().execute("DELETE FROM query_cache")
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM query_cache").fetchone()[0]
+
+
+def build_cache_backend(backend: str, max_size: int, ttl: Optional[int] = None,
+                        path: Optional[str] = None, shared_max_size: int = 10000) -> CacheBackend:
+    """
+    Crea el backend de caché configurado ("memory" o "sqlite").
+    `max_size` limita la caché local de cada proceso; `shared_max_size` la compartida,
+    que atiende a todos los workers juntos y por eso necesita más capacidad.
+    """
+    if backend == "memory":
+        return MemoryCacheBackend(max_size=max_size, ttl=ttl)
+    if backend == "sqlite":
+        if not path:
+            raise ValueError("El backend 'sqlite' requiere una ruta de archivo")
+        return SQLiteCacheBackend(path, max_size=shared_max_size, ttl=ttl)
+    raise ValueError(f"Backend de caché desconocido: {backend}")
@@ -1,15 +1,20 @@
 import os
+import queue
+import threading
 from datetime import datetime
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_community.vectorstores import FAISS
 from langchain.schema import Document
 from dotenv import load_dotenv
-from app.ingestion import cargar_chunks_eventos_deportivos
-  # Importa tu función existente
+from app.ingestion import iterar_chunks, iterar_partidos_fechas, ligas_relevantes
+from app.fixtures import FixtureTable
+from app.vector_cache import VectorCache, CachedEmbeddings
 
 load_dotenv()
 
 class EmbeddingGenerator:
+    model_name = "sentence-transformers/all-mpnet-base-v2"
+
     def __init__(self, embedding_type="huggingface", device="cpu"):
         """
         :param embedding_type: Actualmente solo soporta "huggingface"
@@ -22,31 +27,97 @@ class EmbeddingGenerator:
     def _load_embedding_model(self):
         """Carga el modelo de embeddings de HuggingFace"""
         return HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-mpnet-base-v2",
+            model_name=self.model_name,
             model_kwargs={'device': self.device},  # aquí usamos self.device
             encode_kwargs={'normalize_embeddings': False}
         )
 
-    def generate_embeddings_from_api(self, save_path="vector_store/faiss_index"):
-        """Genera embeddings desde los datos de la API de fútbol"""
+    def generate_embeddings_from_api(self, save_path="vector_store/faiss_index", fechas=None, buffer_size=8,
+                                     cache_dir=None, ligas=None):
+        """
+        Genera embeddings desde los datos de la API de fútbol.
+        La descarga (streaming) corre en un hilo productor y los chunks se embeben a medida
+        que llegan; la cola acotada (`buffer_size`) mantiene el pico de memoria plano.
+        Con `cache_dir` solo se codifican los textos que no estén en la caché de vectores;
+        `ligas` reemplaza la lista blanca por defecto (ej: la unión de todos los tenants).
+        """
+        cache = VectorCache(cache_dir, model_id=f"{self.model_name}|normalize=False") if cache_dir else None
+        embeddings = CachedEmbeddings(self.embeddings, cache) if cache else self.embeddings
+        partidos = FixtureTable()
+        cola = queue.Queue(maxsize=buffer_size)
+        fin = object()
+        errores = []
+        detener = threading.Event()  # el consumidor falló: el productor corta la descarga
+
+        def poner(item) -> bool:
+            while not detener.is_set():
+                try:
+                    cola.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def productor():
+            def registrar(fixtures):
+                # Partidos decodificados una sola vez (tabla compacta)
+                for fixture in fixtures:
+                    partidos.append(fixture)
+                    yield fixture
+            chunks = iterar_chunks(registrar(iterar_partidos_fechas(fechas, ligas or ligas_relevantes)))
+            try:
+                for chunk in chunks:
+                    if not poner(chunk):
+                        break
+            except Exception as e:
+                errores.append(e)
+            finally:
+                chunks.close()  # libera la respuesta HTTP en streaming
+                poner(fin)
+
         try:
-            # Obtiene los chunks usando tu función existente
-            chunks = cargar_chunks_eventos_deportivos()
-            
-            # Convierte a documentos LangChain
-            documents = [
-                Document(
-                    page_content=chunk.page_content,
-                    metadata={
-                        "source": "api-football",
-                        "date": str(datetime.now()),
-                        "content_type": "football-match"
-                    }
-                ) for chunk in chunks
-            ]
-            
-            # Genera y guarda los embeddings
-            vector_store = FAISS.from_documents(documents, self.embeddings)
+            threading.Thread(target=productor, daemon=True).start()
+
+            vector_store = None
+            terminado = False
+            while not terminado:
+                # Toma lo que haya disponible para embeber por lotes
+                lote = [cola.get()]
+                while len(lote) < buffer_size:
+                    try:
+                        lote.append(cola.get_nowait())
+                    except queue.Empty:
+                        break
+                if lote[-1] is fin:
+                    lote.pop()
+                    terminado = True
+                if not lote:
+                    continue
+
+                # Convierte a documentos LangChain
+                documents = [
+                    Document(
+                        page_content=chunk.page_content,
+                        metadata={
+                            **chunk.metadata,
+                            "source": "api-football",
+                            "date": str(datetime.now()),
+                            "content_type": "football-match"
+                        }
+                    ) for chunk in lote
+                ]
+                if vector_store is None:
+                    vector_store = FAISS.from_documents(documents, embeddings)
+                else:
+                    vector_store.add_documents(documents)
+
+            if errores:
+                raise errores[0]
+
+            if cache:
+                cache.save()
+                print(f"[PERF] Caché de embeddings: {cache.hits} reutilizados | {cache.misses} codificados")
+
             os.makedirs(save_path, exist_ok=True)
             
             # Guarda con seguridad
@@ -54,11 +125,15 @@ class EmbeddingGenerator:
                 folder_path=save_path,
                 index_name="index"
             )
+            # La tabla viaja con el índice: los procesos que sirven no re-consultan la API
+            partidos.save(os.path.join(save_path, "fixtures.json"))
             return vector_store
 
         except Exception as e:
             print(f"❌ Error generando embeddings: {str(e)}")
             raise
+        finally:
+            detener.set()
 
     def load_saved_index(self, path="vector_store/faiss_index"):
         """Carga un índice FAISS existente de forma segura"""
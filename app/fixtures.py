@@ -0,0 +1,164 @@
+import json
+from array import array
+from dataclasses import dataclass
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import pytz
+
+
+@lru_cache(maxsize=32)
+def zona_horaria(nombre: str):
+    """pytz.timezone cacheado (se consulta una vez por zona, no por partido)"""
+    return pytz.timezone(nombre)
+
+
+@dataclass(slots=True)
+class Fixture:
+    """Partido ya decodificado: solo los campos que usa el RAG"""
+    id: int
+    kickoff: int  # epoch UTC en segundos
+    local: str
+    visitante: str
+    liga: str
+    pais: Optional[str]
+
+    @classmethod
+    def from_api(cls, partido: dict) -> Optional["Fixture"]:
+        """Decodifica un partido crudo de api-football (None si le faltan datos)"""
+        try:
+            fixture = partido["fixture"]
+            league = partido["league"]
+            teams = partido["teams"]
+            kickoff = fixture.get("timestamp")
+            if kickoff is None:
+                kickoff = datetime.strptime(fixture["date"], "%Y-%m-%dT%H:%M:%S%z").timestamp()
+            return cls(
+                id=int(fixture["id"]),
+                kickoff=int(kickoff),
+                local=teams["home"]["name"],
+                visitante=teams["away"]["name"],
+                liga=league["name"],
+                pais=league.get("country")
+            )
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    @property
+    def liga_pais(self) -> Tuple[str, Optional[str]]:
+        return (self.liga, self.pais)
+
+    def fecha_local(self, tz: str) -> date:
+        return datetime.fromtimestamp(self.kickoff, zona_horaria(tz)).date()
+
+    def formatear(self, tz: str = "America/Argentina/Buenos_Aires", etiqueta: str = "ARG") -> str:
+        """Formatea un partido: Equipos, Liga y Hora local"""
+        hora = datetime.fromtimestamp(self.kickoff, zona_horaria(tz)).strftime("%H:%M")
+        liga_completa = f"{self.liga} ({self.pais})" if self.pais else self.liga
+        return f"⚽ {self.local} vs {self.visitante} | {liga_completa} | {hora} ({etiqueta})"
+
+
+class FixtureTable:
+    """
+    Almacén columnar de partidos: ids y horarios en arrays de enteros,
+    equipos/ligas/países como índices a un pool de strings internados.
+    """
+
+    def __init__(self):
+        self._strings: List[str] = []
+        self._string_index: Dict[str, int] = {}
+        self.ids = array('q')
+        self.kickoffs = array('q')
+        self._local = array('i')
+        self._visitante = array('i')
+        self._liga = array('i')
+        self._pais = array('i')  # -1 = sin país
+        self._fila_por_id: Dict[int, int] = {}
+
+    def _intern(self, valor: Optional[str]) -> int:
+        if valor is None:
+            return -1
+        idx = self._string_index.get(valor)
+        if idx is None:
+            idx = len(self._strings)
+            self._strings.append(valor)
+            self._string_index[valor] = idx
+        return idx
+
+    def _str(self, idx: int) -> Optional[str]:
+        return self._strings[idx] if idx >= 0 else None
+
+    def append(self, fixture: Fixture):
+        fila = self._fila_por_id.get(fixture.id)
+        if fila is not None:
+            # Mismo partido recibido dos veces: se queda el último
+            self.kickoffs[fila] = fixture.kickoff
+            return
+        self._fila_por_id[fixture.id] = len(self.ids)
+        self.ids.append(fixture.id)
+        self.kickoffs.append(fixture.kickoff)
+        self._local.append(self._intern(fixture.local))
+        self._visitante.append(self._intern(fixture.visitante))
+        self._liga.append(self._intern(fixture.liga))
+        self._pais.append(self._intern(fixture.pais))
+
+    def extend(self, fixtures: Iterable[Fixture]):
+        for fixture in fixtures:
+            self.append(fixture)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, fila: int) -> Fixture:
+        return Fixture(
+            id=self.ids[fila],
+            kickoff=self.kickoffs[fila],
+            local=self._strings[self._local[fila]],
+            visitante=self._strings[self._visitante[fila]],
+            liga=self._strings[self._liga[fila]],
+            pais=self._str(self._pais[fila])
+        )
+
+    def __iter__(self) -> Iterator[Fixture]:
+        return (self[i] for i in range(len(self)))
+
+    def __contains__(self, fixture_id) -> bool:
+        return int(fixture_id) in self._fila_por_id
+
+    def get(self, fixture_id) -> Optional[Fixture]:
+        fila = self._fila_por_id.get(int(fixture_id))
+        return self[fila] if fila is not None else None
+
+    def to_dict(self) -> dict:
+        return {
+            "strings": self._strings,
+            "ids": self.ids.tolist(),
+            "kickoffs": self.kickoffs.tolist(),
+            "local": self._local.tolist(),
+            "visitante": self._visitante.tolist(),
+            "liga": self._liga.tolist(),
+            "pais": self._pais.tolist()
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "FixtureTable":
+        tabla = cls()
+        tabla._strings = list(data["strings"])
+        tabla._string_index = {valor: i for i, valor in enumerate(tabla._strings)}
+        tabla.ids = array('q', data["ids"])
+        tabla.kickoffs = array('q', data["kickoffs"])
+        tabla._local = array('i', data["local"])
+        tabla._visitante = array('i', data["visitante"])
+        tabla._liga = array('i', data["liga"])
+        tabla._pais = array('i', data["pais"])
+        tabla._fila_por_id = {fid: fila for fila, fid in enumerate(tabla.ids)}
+        return tabla
+
+    def save(self, path: str):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str) -> "FixtureTable":
+        with open(path, 'r') as f:
+            return cls.from_dict(json.load(f))
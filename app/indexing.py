@@ -0,0 +1,234 @@
+import os
+import json
+import time
+import shutil
+import socket
+from datetime import datetime, date
+from typing import List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+DEFAULT_STORE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "vector_store"
+)
+
+
+class IndexLockedError(RuntimeError):
+    """Otro proceso está construyendo el índice"""
+
+
+class IndexLock:
+    """
+    Lock de archivo para que un solo proceso construya índices a la vez.
+    Es un lock del sistema operativo (flock; msvcrt en Windows) sobre un archivo que nunca
+    se borra: el kernel lo libera si el proceso muere, así que no hay locks abandonados que
+    detectar ni carreras al reemplazarlos. El contenido (pid, host) es solo informativo.
+    """
+
+    def __init__(self, path: str):
+        """
+        :param path: ruta del archivo de lock
+        """
+        self.path = path
+        self._fd: Optional[int] = None
+
+    def _owner(self) -> Optional[dict]:
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _bloquear(fd: int):
+        """Lock exclusivo no bloqueante; OSError si lo tiene otro proceso"""
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+
+    @staticmethod
+    def _desbloquear(fd: int):
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        else:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+    def acquire(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Sin O_TRUNC: abrirlo no pisa los datos del dueño actual
+        fd = os.open(self.path, os.O_CREAT | os.O_RDWR)
+        try:
+            self._bloquear(fd)
+        except OSError:
+            os.close(fd)
+            raise IndexLockedError(f"Índice en construcción por otro proceso ({self._owner()})")
+        os.ftruncate(fd, 0)
+        os.lseek(fd, 0, os.SEEK_SET)
+        os.write(fd, json.dumps({"pid": os.getpid(), "host": socket.gethostname(),
+                                 "created": time.time()}).encode("utf-8"))
+        self._fd = fd
+        return self
+
+    def release(self):
+        if self._fd is not None:
+            try:
+                os.ftruncate(self._fd, 0)
+                self._desbloquear(self._fd)
+            finally:
+                os.close(self._fd)
+                self._fd = None
+
+    def locked(self) -> bool:
+        """True si otro proceso tiene el lock en este momento"""
+        if self._fd is not None:
+            return True
+        try:
+            fd = os.open(self.path, os.O_RDWR)
+        except FileNotFoundError:
+            return False
+        try:
+            self._bloquear(fd)
+        except OSError:
+            return True
+        else:
+            self._desbloquear(fd)
+            return False
+        finally:
+            os.close(fd)
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class IndexStore:
+    """
+    Índices FAISS versionados dentro de vector_store/:
+      indexes/<versión>/    -> archivos del índice (solo lectura una vez publicado)
+      metadata.json         -> versión vigente y datos de la última construcción
+      embedding_cache/      -> vectores ya calculados, reutilizados entre construcciones
+      live.json             -> marcadores en vivo del poller (compartidos por los procesos que sirven)
+      .indexing.lock        -> lock del constructor
+    """
+
+    def __init__(self, base_dir: Optional[str] = None):
+        self.base_dir = base_dir or DEFAULT_STORE_DIR
+        self.indexes_dir = os.path.join(self.base_dir, "indexes")
+        self.metadata_path = os.path.join(self.base_dir, "metadata.json")
+        self.lock_path = os.path.join(self.base_dir, ".indexing.lock")
+        self.embedding_cache_dir = os.path.join(self.base_dir, "embedding_cache")
+        self.live_path = os.path.join(self.base_dir, "live.json")
+
+    def lock(self) -> IndexLock:
+        return IndexLock(self.lock_path)
+
+    def read_metadata(self) -> dict:
+        try:
+            with open(self.metadata_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def current_version(self) -> Optional[str]:
+        return self.read_metadata().get("current")
+
+    def version_path(self, version: str) -> str:
+        return os.path.join(self.indexes_dir, version)
+
+    def current_path(self) -> Optional[str]:
+        version = self.current_version()
+        return self.version_path(version) if version else None
+
+    def is_current(self, fechas: Optional[List[str]] = None) -> bool:
+        """
+        Verifica si la versión vigente contiene los días `fechas` (al cambiar el día de
+        cualquier tenant hace falta otra); sin `fechas`, si es del día actual.
+        """
+        metadata = self.read_metadata()
+        if fechas:
+            return bool(metadata.get("current")) and set(fechas) <= set(metadata.get("fechas") or [])
+        return metadata.get("last_update") == date.today().isoformat()
+
+    def new_version(self) -> str:
+        return datetime.now().strftime("%Y%m%dT%H%M%S")
+
+    def versions(self) -> List[str]:
+        if not os.path.isdir(self.indexes_dir):
+            return []
+        return sorted(
+            d for d in os.listdir(self.indexes_dir)
+            if os.path.isdir(os.path.join(self.indexes_dir, d))
+        )
+
+    def publish(self, version: str, documents: int, **extra):
+        """Apunta metadata.json a la nueva versión con un reemplazo atómico"""
+        metadata = {
+            "current": version,
+            "last_update": date.today().isoformat(),
+            "built_at": datetime.now().isoformat(timespec="seconds"),
+            "source": "api-football",
+            "documents": documents,
+            **extra
+        }
+        tmp_path = f"{self.metadata_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(metadata, f)
+        os.replace(tmp_path, self.metadata_path)
+        return metadata
+
+    def prune(self, keep: int = 3):
+        """Borra versiones viejas conservando la vigente y las últimas `keep`"""
+        current = self.current_version()
+        old = [v for v in self.versions() if v != current]
+        if keep:
+            old = old[:-keep]
+        for version in old:
+            shutil.rmtree(self.version_path(version), ignore_errors=True)
+        return old
+
+
+def build_index(generator, store: Optional[IndexStore] = None, force: bool = True, keep: int = 3,
+                fechas: Optional[List[str]] = None, ligas: Optional[set] = None,
+                shard_by: Optional[str] = None, num_shards: int = 8) -> Optional[dict]:
+    """
+    Construye y publica una versión nueva del índice bajo lock.
+    Con force=False no hace nada si la versión vigente ya contiene `fechas` (o es de hoy).
+    Con shard_by ("league" o "season") además la reparte en `num_shards` shards (ver app/shards.py).
+    """
+    store = store or IndexStore()
+    with store.lock():
+        if not force and store.is_current(fechas):
+            print(f"[INFO] Índice vigente ({store.current_version()}), no se regenera")
+            return None
+
+        start = time.time()
+        version = store.new_version()
+        path = store.version_path(version)
+        try:
+            vector_store = generator.generate_embeddings_from_api(
+                path, fechas=fechas, cache_dir=store.embedding_cache_dir, ligas=ligas
+            )
+            extra = {"fechas": fechas} if fechas else {}
+            if shard_by and vector_store:
+                from app.shards import SHARDS_DIR, particionar_indice
+                extra["shards"] = particionar_indice(vector_store, os.path.join(path, SHARDS_DIR),
+                                                     por=shard_by, num_shards=num_shards)
+                extra["shard_by"] = shard_by
+        except Exception:
+            shutil.rmtree(path, ignore_errors=True)
+            raise
+
+        metadata = store.publish(version, vector_store.index.ntotal if vector_store else 0, **extra)
+        store.prune(keep)
+        print(f"[PERF] Índice {version} construido en {time.time()-start:.2f}s | Documentos: {metadata['documents']}")
+        return metadata
@@ -1,9 +1,11 @@
 import requests
 import os
-from datetime import datetime
-import pytz
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional
 from langchain.schema import Document
 from dotenv import load_dotenv
+from app.fixtures import Fixture, zona_horaria
+from app.streaming import iterar_array_json
 
 # Carga variables de entorno
 load_dotenv()
@@ -38,59 +40,120 @@ ligas_relevantes = {
     ("Primera División - Clausura", "Uruguay"),
 }
 
-def obtener_partidos_argentina():
-    """Obtiene partidos del día en Argentina filtrando solo ligas relevantes."""
-    tz_arg = pytz.timezone('America/Argentina/Buenos_Aires')
-    hoy = datetime.now(tz_arg).strftime("%Y-%m-%d")
-    
+TZ_ARG = "America/Argentina/Buenos_Aires"
+
+def fechas_por_zonas(zonas: Iterable[str], dias: int = 1, desde: Optional[str] = None) -> List[str]:
+    """
+    Días ARG (los que se piden a la API con timezone=TZ_ARG) que cubren `dias` días locales
+    de cada zona, desde hoy en esa zona o desde `desde`. Un tenant de Nueva York a las 23:00
+    sigue en su día aunque en Argentina ya sea el siguiente; uno de Madrid empieza su día
+    cuando en Argentina todavía es la tarde anterior.
+    """
+    arg = zona_horaria(TZ_ARG)
+    fechas = set()
+    for nombre in set(zonas) or {TZ_ARG}:
+        tz = zona_horaria(nombre)
+        inicio = date.fromisoformat(desde) if desde else datetime.now(tz).date()
+        for i in range(max(dias, 1)):
+            dia = inicio + timedelta(days=i)
+            desde_local = tz.localize(datetime.combine(dia, datetime.min.time()))
+            hasta_local = tz.localize(datetime.combine(dia + timedelta(days=1), datetime.min.time()))
+            primero = desde_local.astimezone(arg).date()
+            ultimo = (hasta_local.astimezone(arg) - timedelta(seconds=1)).date()
+            while primero <= ultimo:
+                fechas.add(primero.isoformat())
+                primero += timedelta(days=1)
+    return sorted(fechas)
+
+def iterar_partidos(fecha: Optional[str] = None, ligas=ligas_relevantes) -> Iterator[Fixture]:
+    """
+    Descarga los partidos de un día (YYYY-MM-DD, por defecto hoy en ARG) parseando el JSON
+    en streaming: cada partido se filtra y decodifica apenas llega, sin esperar al resto.
+    """
+    fecha = fecha or datetime.now(zona_horaria(TZ_ARG)).strftime("%Y-%m-%d")
     params = {
-        "date": hoy,
-        "timezone": "America/Argentina/Buenos_Aires"
+        "date": fecha,
+        "timezone": TZ_ARG
     }
-    
-    try:
-        response = requests.get(BASE_URL, headers=HEADERS, params=params)
+
+    with requests.get(BASE_URL, headers=HEADERS, params=params, stream=True, timeout=60) as response:
         response.raise_for_status()
-        data = response.json()
-        
-        partidos = data.get("response", [])
-        
-        # Filtra partidos con datos completos y ligas relevantes (por nombre y país)
-        filtrados = [
-            p for p in partidos
-            if all(key in p for key in ["fixture", "teams", "league"])
-            and (p["league"]["name"], p["league"].get("country")) in ligas_relevantes
-        ]
-        return filtrados
+        otros = {}
+        for p in iterar_array_json(response.iter_content(chunk_size=64 * 1024), "response", otros):
+            fixture = Fixture.from_api(p)
+            # Filtra partidos con datos completos y ligas relevantes (por nombre y país)
+            if fixture is not None and fixture.liga_pais in ligas:
+                yield fixture
+        if otros.get("errors"):
+            # Ej: cuota agotada; la respuesta llega sin partidos y no debe publicarse como un día vacío
+            raise RuntimeError(f"La API informó errores para {fecha}: {otros['errors']}")
 
-    except Exception as e:
-        print(f"⚠️ Error al consultar API: {e}")
-        return []
+def iterar_partidos_fechas(fechas: Optional[Iterable[str]] = None, ligas=ligas_relevantes) -> Iterator[Fixture]:
+    """
+    Encadena varios días (backfills), en orden. Un día con error (HTTP, corte a mitad
+    de la descarga o errores informados por la API) corta la ingesta: publicar un día
+    incompleto como índice vigente es peor que conservar la versión anterior.
+    """
+    for fecha in fechas or [None]:
+        try:
+            yield from iterar_partidos(fecha, ligas)
+        except Exception as e:
+            print(f"⚠️ Error al consultar API ({fecha or 'hoy'}): {e}")
+            raise
 
-def formatear_partido(partido):
+def formatear_partido(partido: Fixture, tz: str = TZ_ARG) -> str:
     """Formatea un partido: Equipos, Liga y Hora (ARG)."""
-    fixture = partido["fixture"]
-    liga = partido["league"]["name"]
-    pais = partido["league"].get("country")
-    hora_arg = datetime.strptime(
-        fixture["date"], 
-        "%Y-%m-%dT%H:%M:%S%z"
-    ).astimezone(pytz.timezone('America/Argentina/Buenos_Aires')).strftime("%H:%M")
-    
-    liga_completa = f"{liga} ({pais})" if pais else liga
-    return f"⚽ {partido['teams']['home']['name']} vs {partido['teams']['away']['name']} | {liga_completa} | {hora_arg} (ARG)"
+    return partido.formatear(tz)
+
+
+def iterar_chunks(partidos: Iterable[Fixture], tamano: int = 20, tz: str = TZ_ARG) -> Iterator[Document]:
+    """
+    Agrupa partidos en Documents por (liga, país, fecha) de a lo sumo `tamano` partidos.
+    Un grupo se emite al llenarse y, como los partidos llegan ordenados por día, todos los
+    grupos abiertos se emiten cuando el stream pasa a otra fecha: el embedding arranca
+    apenas termina el primer día y el buffer queda acotado a un día de partidos.
+    """
+    grupos: Dict[tuple, List[Fixture]] = {}
+    fecha_actual = None
+    emitidos = 0
+
+    def documento(clave, fixtures):
+        liga, pais, fecha = clave
+        # Ids alineados con las líneas del contenido, para unir datos en vivo sin re-embeber
+        return Document(
+            page_content="\n".join(formatear_partido(p, tz) for p in fixtures),
+            metadata={
+                "fixture_ids": [p.id for p in fixtures],
+                "league": liga,
+                "country": pais,
+                "match_date": fecha
+            }
+        )
 
+    for partido in partidos:
+        fecha = datetime.fromtimestamp(partido.kickoff, zona_horaria(tz)).date().isoformat()
+        if fecha != fecha_actual:
+            for clave, grupo in grupos.items():
+                yield documento(clave, grupo)
+                emitidos += 1
+            grupos.clear()
+            fecha_actual = fecha
+        clave = (partido.liga, partido.pais, fecha)
+        grupo = grupos.setdefault(clave, [])
+        grupo.append(partido)
+        if len(grupo) >= tamano:
+            yield documento(clave, grupos.pop(clave))
+            emitidos += 1
 
-def generar_documento():
-    """Crea un Document de LangChain con partidos relevantes del día."""
-    partidos = obtener_partidos_argentina()
-    if not partidos:
-        return Document(page_content="No hay partidos relevantes programados hoy.")
-    
-    contenido = "\n".join([formatear_partido(p) for p in partidos])
-    return Document(page_content=contenido)
+    for clave, grupo in grupos.items():
+        yield documento(clave, grupo)
+        emitidos += 1
 
-def cargar_chunks_eventos_deportivos():
-    """Devuelve una lista con un documento LangChain."""
-    return [generar_documento()]
+    if not emitidos:
+        yield Document(page_content="No hay partidos relevantes programados hoy.")
 
+def cargar_chunks_eventos_deportivos(partidos: Optional[Iterable[Fixture]] = None):
+    """Devuelve la lista de documentos LangChain (un chunk por liga y fecha)."""
+    if partidos is None:
+        partidos = iterar_partidos_fechas()
+    return list(iterar_chunks(partidos))
@@ -0,0 +1,203 @@
+import os
+import json
+import time
+import threading
+import requests
+from typing import Dict, Iterable, Optional
+from app.ingestion import BASE_URL, HEADERS
+
+# Estados de api-football
+ESTADOS_EN_JUEGO = {"1H", "HT", "2H", "ET", "BT", "P", "LIVE", "INT"}
+ESTADOS_FINALIZADOS = {"FT", "AET", "PEN"}
+
+
+class LiveScore:
+    """Campos del partido que cambian durante el juego"""
+    __slots__ = ("goles_local", "goles_visitante", "minuto", "estado", "actualizado")
+
+    def __init__(self, goles_local: Optional[int], goles_visitante: Optional[int],
+                 minuto: Optional[int], estado: str, actualizado: Optional[float] = None):
+        self.goles_local = goles_local
+        self.goles_visitante = goles_visitante
+        self.minuto = minuto
+        self.estado = estado
+        self.actualizado = actualizado or time.time()
+
+    @classmethod
+    def from_api(cls, partido: dict) -> "LiveScore":
+        status = partido["fixture"].get("status") or {}
+        goals = partido.get("goals") or {}
+        return cls(goals.get("home"), goals.get("away"), status.get("elapsed"), status.get("short") or "")
+
+    def clave(self) -> tuple:
+        return (self.goles_local, self.goles_visitante, self.minuto, self.estado)
+
+    def to_list(self) -> list:
+        return [*self.clave(), self.actualizado]
+
+    def formatear(self) -> str:
+        marcador = f"{self.goles_local if self.goles_local is not None else 0}-" \
+                   f"{self.goles_visitante if self.goles_visitante is not None else 0}"
+        if self.estado == "HT":
+            return f"🔴 EN VIVO {marcador} (Entretiempo)"
+        if self.estado in ESTADOS_EN_JUEGO:
+            minuto = f"{self.minuto}'" if self.minuto else self.estado
+            return f"🔴 EN VIVO {marcador} ({minuto})"
+        if self.estado in ESTADOS_FINALIZADOS:
+            return f"Final {marcador}"
+        return self.estado
+
+
+class LiveFixtureStore:
+    """
+    Marcadores en memoria indexados por fixture id, sin tocar los embeddings.
+    Con `path` se comparte entre procesos: un único poller (ver `run_embeddings live`)
+    escribe el archivo y los procesos que sirven lo releen cuando cambia.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_age: int = 3 * 3600, check_interval: float = 1.0):
+        """
+        :param path: archivo compartido (ej: vector_store/live.json); None = solo en memoria
+        :param max_age: segundos sin novedades tras los cuales se descarta un partido
+        :param check_interval: cada cuánto se mira si el archivo cambió
+        """
+        self.path = path
+        self.max_age = max_age
+        self.check_interval = check_interval
+        self._data: Dict[int, LiveScore] = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._mtime = None
+        self._last_check = 0.0
+        self._follow()
+
+    @property
+    def generation(self) -> int:
+        """Cambia con cada actualización (sirve para invalidar ETags)"""
+        self._follow()
+        return self._generation
+
+    def _follow(self):
+        """Relee el archivo compartido si otro proceso lo actualizó"""
+        if not self.path or time.time() - self._last_check < self.check_interval:
+            return
+        self._last_check = time.time()
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+            if mtime == self._mtime:
+                return
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        scores = {int(fid): LiveScore(*valores) for fid, valores in data.get("scores", {}).items()}
+        with self._lock:
+            self._data = scores
+            self._generation = data.get("generation", 0)
+            self._mtime = mtime
+
+    def save(self):
+        """Publica el estado en el archivo compartido (reemplazo atómico)"""
+        with self._lock:
+            data = {
+                "generation": self._generation,
+                "scores": {str(fid): score.to_list() for fid, score in self._data.items()}
+            }
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+        try:
+            self._mtime = os.stat(self.path).st_mtime_ns  # las escrituras propias no se releen
+        except OSError:
+            pass
+
+    def update(self, partidos: Iterable[dict]):
+        """Actualiza desde partidos crudos de la API"""
+        nuevos = {}
+        for partido in partidos:
+            try:
+                nuevos[int(partido["fixture"]["id"])] = LiveScore.from_api(partido)
+            except (KeyError, TypeError, ValueError):
+                continue
+        with self._lock:
+            cambios = [fid for fid, score in nuevos.items()
+                       if fid not in self._data or self._data[fid].clave() != score.clave()]
+            self._data.update(nuevos)
+            if cambios:
+                self._generation += 1
+        return len(nuevos)
+
+    def prune(self) -> int:
+        """Descarta partidos sin novedades hace más de max_age (terminados o que la API dejó de informar)"""
+        limite = time.time() - self.max_age
+        with self._lock:
+            viejos = [fid for fid, score in self._data.items() if score.actualizado < limite]
+            for fid in viejos:
+                del self._data[fid]
+            if viejos:
+                self._generation += 1
+        return len(viejos)
+
+    def get(self, fixture_id) -> Optional[LiveScore]:
+        self._follow()
+        return self._data.get(int(fixture_id))
+
+    def in_play(self) -> set:
+        """Ids de los partidos que están en juego según el último sondeo"""
+        self._follow()
+        return {fid for fid, score in list(self._data.items()) if score.estado in ESTADOS_EN_JUEGO}
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class LivePoller:
+    """Sondea el endpoint de partidos en vivo y actualiza el store en segundo plano"""
+
+    def __init__(self, store: LiveFixtureStore, interval: int = 30, timeout: int = 10):
+        self.store = store
+        self.interval = interval
+        self.timeout = timeout
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _get(self, params: dict) -> list:
+        response = requests.get(BASE_URL, headers=HEADERS, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json().get("response", [])
+
+    def poll_once(self):
+        """Un ciclo: partidos en vivo + estado final de los que dejaron de estarlo"""
+        en_juego_antes = self.store.in_play()
+        partidos = self._get({"live": "all"})
+        self.store.update(partidos)
+
+        # Los que salieron de la lista en vivo terminaron (o se suspendieron): se consulta su estado final
+        vistos = {p["fixture"]["id"] for p in partidos if "fixture" in p}
+        terminados = sorted(en_juego_antes - vistos)
+        for i in range(0, len(terminados), 20):  # la API acepta hasta 20 ids por consulta
+            ids = "-".join(str(fid) for fid in terminados[i:i + 20])
+            self.store.update(self._get({"ids": ids}))
+
+        self.store.prune()
+        if self.store.path:
+            self.store.save()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+            except Exception as e:
+                print(f"[ERROR] Sondeo de partidos en vivo: {e}")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
@@ -1,9 +1,21 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import HTMLResponse
-from pydantic import BaseModel
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
+from starlette.middleware.gzip import GZipMiddleware
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from app.rag_engine import RAGEngine
+from app.profiling import torch_threads, set_torch_threads
+import gzip
+import json
+import hashlib
+import hmac
 import logging
 
+try:
+    import brotli  # opcional (no está en requirements.txt): solo para la página de inicio
+except ImportError:
+    brotli = None
+
 # Configuración básica de logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -15,36 +27,209 @@ app = FastAPI(
     version="1.0.0"
 )
 
+class CompresionSelectiva(GZipMiddleware):
+    """GZip para las respuestas JSON, salvo rutas que hacen streaming o ya vienen comprimidas"""
+
+    RUTAS_EXCLUIDAS = {"/", "/ask/batch"}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] in self.RUTAS_EXCLUIDAS:
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+app.add_middleware(CompresionSelectiva, minimum_size=500)
+
 # Instancia global del motor RAG
 rag_engine = RAGEngine()
 
 # Modelo para la entrada del usuario
 class QuestionRequest(BaseModel):
     question: str
+    tenant: Optional[str] = None
+
+# Modelo para consultas por lotes
+class BatchQuestionRequest(BaseModel):
+    questions: List[str] = Field(..., min_length=1, max_length=100)
+    tenant: Optional[str] = None
+
+def resolver_tenant(request: Request, tenant: Optional[str] = None) -> str:
+    """Tenant de la consulta: parámetro/cuerpo, header X-Tenant o el por defecto"""
+    nombre = tenant or request.headers.get("x-tenant")
+    try:
+        return rag_engine.get_tenant(nombre).nombre
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Tenant desconocido: {nombre}")
+
+def formatear_resultado(result: dict) -> dict:
+    """Respuesta pública de la API a partir del resultado del motor"""
+    # Eliminar duplicados manteniendo el orden
+    seen = set()
+    unique_docs = []
+    for doc in result["docs_used"]:
+        content = doc["content"]  # Ahora accedemos como diccionario
+        if content not in seen:
+            seen.add(content)
+            unique_docs.append(content)
+
+    return {
+        "question": result["question"],
+        "answer": result["answer"],
+        "docs_used": unique_docs,
+        "degraded": result.get("degraded", False)
+    }
+
+def es_admin(request: Request) -> bool:
+    """El header X-Admin-Token coincide con RAG_ADMIN_TOKEN (sin token configurado, nadie es admin)"""
+    token = rag_engine.config.admin_token
+    enviado = request.headers.get("x-admin-token")
+    return bool(token and enviado) and hmac.compare_digest(enviado.encode("utf-8"), token.encode("utf-8"))
+
+def requiere_admin(request: Request):
+    if not es_admin(request):
+        raise HTTPException(status_code=403, detail="Requiere X-Admin-Token.")
+
+def consultar(request: Request, question: str, tenant: str):
+    """
+    Ejecuta la consulta; con el header X-Profile: 1 (profiling habilitado y X-Admin-Token válido)
+    la perfila y devuelve el id del artefacto en X-Profile-Id. Devuelve (resultado, headers extra).
+    """
+    if not (rag_engine.config.profiling and request.headers.get("x-profile") in ("1", "true")
+            and es_admin(request)):
+        return rag_engine.query(question, tenant=tenant), {}
+
+    with rag_engine.profiler.capturar("ask") as captura:
+        result = rag_engine.query(question, tenant=tenant)
+    if captura is None:
+        # Ya hay demasiadas capturas en curso: la consulta se responde sin perfilar
+        return result, {"X-Profile-Id": "ocupado"}
+    return result, {"X-Profile-Id": captura.id, "Cache-Control": "no-store"}
 
 @app.post("/ask", tags=["Consultas"])
-def ask_question(payload: QuestionRequest):
+def ask_question(payload: QuestionRequest, request: Request):
+    tenant = resolver_tenant(request, payload.tenant)
     try:
-        result = rag_engine.query(payload.question)
-
-        # Eliminar duplicados manteniendo el orden
-        seen = set()
-        unique_docs = []
-        for doc in result["docs_used"]:
-            content = doc["content"]  # Ahora accedemos como diccionario
-            if content not in seen:
-                seen.add(content)
-                unique_docs.append(content)
-
-        return {
-            "question": result["question"],
-            "answer": result["answer"],
-            "docs_used": unique_docs
-        }
+        result, headers = consultar(request, payload.question, tenant)
+        return JSONResponse(formatear_resultado(result), headers=headers)
+    except Exception as e:
+        logger.error(f"[ERROR] Fallo al procesar pregunta: {e}")
+        raise HTTPException(status_code=500, detail="Error al procesar la pregunta.")
+
+def etag_coincide(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparación débil de If-None-Match (admite listas, '*' y el prefijo W/)"""
+    if not if_none_match:
+        return False
+    opaco = etag.removeprefix("W/")
+    return any(parte.strip() == "*" or parte.strip().removeprefix("W/") == opaco
+               for parte in if_none_match.split(","))
+
+def calcular_etag(question: str, tenant: str) -> Optional[str]:
+    """
+    ETag de una pregunta: (tenant, día local del tenant, pregunta normalizada, versión del
+    índice, generación en vivo). La generación va siempre: el marcador final sigue en el contexto
+    cuando ya no hay partidos en juego, y sin datos en vivo no cambia. El día cambia el contexto
+    a la medianoche del tenant aunque el índice sea el mismo. Es débil (W/): el middleware puede
+    servir el mismo contenido con o sin gzip.
+    """
+    if not rag_engine.index_version:
+        return None
+    partes = [tenant, rag_engine.get_tenant(tenant).hoy().isoformat(), question.lower().strip(),
+              rag_engine.index_version, str(rag_engine.live_store.generation)]
+    return 'W/"' + hashlib.sha256("|".join(partes).encode("utf-8")).hexdigest()[:32] + '"'
+
+@app.get("/ask", tags=["Consultas"])
+def ask_question_get(question: str, request: Request, tenant: Optional[str] = None):
+    """
+    Variante GET de /ask, cacheable por navegadores y proxies.
+    Si el cliente ya tiene la respuesta vigente (If-None-Match) devuelve 304 sin tocar el motor.
+    """
+    tenant = resolver_tenant(request, tenant)
+    etag = calcular_etag(question, tenant)
+    if etag and etag_coincide(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag, "Vary": "X-Tenant"})
+
+    try:
+        result, extra = consultar(request, question, tenant)
     except Exception as e:
         logger.error(f"[ERROR] Fallo al procesar pregunta: {e}")
         raise HTTPException(status_code=500, detail="Error al procesar la pregunta.")
 
+    headers = {"Cache-Control": "no-store"}
+    if etag and not any(result.get(flag) for flag in ("degraded", "error", "partial")):
+        max_age = rag_engine.config.live_cache_ttl if result.get("live") else rag_engine.config.cache_ttl or 0
+        headers = {"ETag": etag, "Cache-Control": f"public, max-age={max_age}", "Vary": "X-Tenant"}
+    return JSONResponse(formatear_resultado(result), headers={**headers, **extra})
+
+@app.post("/ask/batch", tags=["Consultas"])
+def ask_batch(payload: BatchQuestionRequest, request: Request):
+    """
+    Responde varias preguntas en una sola llamada.
+    Devuelve NDJSON: una línea por pregunta, en el orden en que se van resolviendo
+    (el campo "index" indica la posición en la lista original).
+    """
+    tenant = resolver_tenant(request, payload.tenant)
+
+    def generar():
+        try:
+            for index, result in rag_engine.query_many(payload.questions, tenant=tenant):
+                linea = {"index": index, **formatear_resultado(result)}
+                yield json.dumps(linea, ensure_ascii=False) + "\n"
+        except Exception as e:
+            logger.error(f"[ERROR] Fallo al procesar lote: {e}")
+            yield json.dumps({"error": "Error al procesar el lote."}, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(generar(), media_type="application/x-ndjson")
+
+@app.get("/stats", tags=["Admin"])
+def stats():
+    """
+    Métricas del motor: tokens por plantilla de prompt (estimados y reportados por el proveedor,
+    incluidos los tokens servidos desde la cache de prefijo) y latencia por shard.
+    """
+    return {
+        "index_version": rag_engine.index_version,
+        "prompts": rag_engine.prompt_stats.snapshot(),
+        "shards": rag_engine.shards.stats.snapshot() if rag_engine.shards else None,
+        "torch_threads": torch_threads()
+    }
+
+@app.post("/admin/profile", tags=["Admin"], dependencies=[Depends(requiere_admin)])
+def start_profile(seconds: float = 30):
+    """
+    Perfila todo el proceso durante `seconds` (máx. 300): todas las consultas en curso
+    quedan en un mismo artefacto, consultable luego en /admin/profiles/{id}.
+    """
+    captura = rag_engine.profiler.iniciar_global(min(max(seconds, 1), 300))
+    if captura is None:
+        raise HTTPException(status_code=409, detail="Hay demasiadas capturas en curso.")
+    return {"id": captura.id, "seconds": min(max(seconds, 1), 300)}
+
+@app.get("/admin/profiles", tags=["Admin"], dependencies=[Depends(requiere_admin)])
+def list_profiles():
+    return {
+        "enabled": rag_engine.config.profiling,
+        "active": rag_engine.profiler.activas(),
+        "profiles": rag_engine.profiler.listar()
+    }
+
+@app.get("/admin/profiles/{profile_id}", tags=["Admin"], dependencies=[Depends(requiere_admin)])
+def get_profile(profile_id: str, format: str = "json"):
+    """Resumen (categorías, contención) o pilas colapsadas con format=folded, para flamegraph.pl/speedscope"""
+    contenido = rag_engine.profiler.leer(profile_id, format)
+    if contenido is None:
+        raise HTTPException(status_code=404, detail="Perfil no encontrado.")
+    if format == "folded":
+        return Response(contenido, media_type="text/plain")
+    return Response(contenido, media_type="application/json")
+
+@app.post("/admin/torch-threads", tags=["Admin"], dependencies=[Depends(requiere_admin)])
+def update_torch_threads(intra_op: int = Query(..., ge=1, le=256)):
+    """Ajusta los hilos intra-op de torch del modelo de embeddings"""
+    resultado = set_torch_threads(intra_op)
+    if resultado is None:
+        raise HTTPException(status_code=501, detail="torch no está instalado.")
+    return resultado
+
 @app.post("/reload", tags=["Admin"])
 def reload_index():
     """
@@ -58,12 +243,8 @@ def reload_index():
         logger.error(f"[ERROR] Error recargando índice: {e}")
         raise HTTPException(status_code=500, detail="Error al recargar el índice.")
 
-@app.get("/", response_class=HTMLResponse, tags=["Interfaz Web"])
-def home():
-    """
-    Interfaz HTML simple para enviar preguntas desde el navegador.
-    """
-    return """
+# Interfaz HTML simple para enviar preguntas desde el navegador.
+HOME_HTML = """
 <!DOCTYPE html>
 <html lang="es">
 <head>
@@ -338,11 +519,8 @@ def home():
             answer.textContent = 'Procesando...';
 
             try {
-                const response = await fetch('/ask', {
-                    method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({ question })
-                });
+                // GET cacheable: las repeticiones las resuelve el navegador o el proxy
+                const response = await fetch('/ask?question=' + encodeURIComponent(question));
 
                 if (!response.ok) {
                     answer.textContent = 'Error en la consulta.';
@@ -359,3 +537,39 @@ def home():
 </body>
 </html>
 """
+
+# La página es estática: se comprime y se calcula su ETag una sola vez
+HOME_BYTES = HOME_HTML.encode("utf-8")
+HOME_HASH = hashlib.sha256(HOME_BYTES).hexdigest()[:16]
+HOME_VARIANTES = {"gzip": gzip.compress(HOME_BYTES, mtime=0)}
+if brotli is not None:
+    HOME_VARIANTES["br"] = brotli.compress(HOME_BYTES)
+# ETag fuerte por representación: cada codificación tiene bytes distintos
+HOME_ETAGS = {None: f'"{HOME_HASH}"', **{c: f'"{HOME_HASH}-{c}"' for c in HOME_VARIANTES}}
+
+def elegir_codificacion(accept_encoding: str) -> Optional[str]:
+    """Elige br > gzip según el header Accept-Encoding del cliente"""
+    aceptadas = {parte.split(";")[0].strip() for parte in accept_encoding.lower().split(",")}
+    for codificacion in ("br", "gzip"):
+        if codificacion in aceptadas and codificacion in HOME_VARIANTES:
+            return codificacion
+    return None
+
+@app.get("/", response_class=HTMLResponse, tags=["Interfaz Web"])
+def home(request: Request):
+    """
+    Interfaz HTML simple para enviar preguntas desde el navegador.
+    """
+    codificacion = elegir_codificacion(request.headers.get("accept-encoding", ""))
+    headers = {
+        "ETag": HOME_ETAGS[codificacion],
+        "Cache-Control": "public, max-age=3600",
+        "Vary": "Accept-Encoding"
+    }
+    if etag_coincide(request.headers.get("if-none-match"), HOME_ETAGS[codificacion]):
+        return Response(status_code=304, headers=headers)
+
+    if codificacion:
+        headers["Content-Encoding"] = codificacion
+        return Response(HOME_VARIANTES[codificacion], media_type="text/html; charset=utf-8", headers=headers)
+    return Response(HOME_BYTES, media_type="text/html; charset=utf-8", headers=headers)
@@ -0,0 +1,267 @@
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Set
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Categorías para el resumen: decide el frame más cercano a la hoja que coincida
+CATEGORIAS = [
+    ("tokenizacion", ("tokenizers", "tokenization_utils")),
+    ("torch", ("torch", "sentence_transformers")),
+    ("faiss", ("faiss",)),
+    ("http", ("urllib3", "requests", "http/client", "ssl.py", "socket.py")),  # LLM y shards
+    ("cache", ("app/cache.py", "sqlite3")),
+]
+# Si la hoja está en estos módulos el hilo está bloqueado en un lock/future/cola
+ESPERA = ("threading.py", "concurrent/futures", "queue.py")
+
+# Captura del request en curso, para sumarle los hilos a los que delega trabajo
+_captura_actual: ContextVar[Optional["Captura"]] = ContextVar("rag_captura", default=None)
+
+
+def torch_threads() -> Optional[dict]:
+    """Hilos de torch (intra-op e inter-op); None si torch no está instalado"""
+    try:
+        import torch
+    except ImportError:
+        return None
+    return {"intra_op": torch.get_num_threads(), "inter_op": torch.get_num_interop_threads()}
+
+
+def set_torch_threads(intra_op: int) -> Optional[dict]:
+    """Ajusta los hilos intra-op de torch (el inter-op solo puede fijarse al arrancar)"""
+    try:
+        import torch
+    except ImportError:
+        return None
+    torch.set_num_threads(intra_op)
+    return torch_threads()
+
+
+def _frame(code) -> str:
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def _hilo(nombre: str) -> str:
+    # "ThreadPoolExecutor-0_3" -> "ThreadPoolExecutor-0": agrupa los workers de un mismo pool
+    return re.sub(r"_\d+$", "", nombre)
+
+
+def _categoria(archivos: List[str]) -> str:
+    for archivo in reversed(archivos):
+        for nombre, patrones in CATEGORIAS:
+            if any(p in archivo for p in patrones):
+                return nombre
+    return "espera" if any(p in archivos[-1] for p in ESPERA) else "python"
+
+
+class Captura:
+    """Muestras de una captura: pilas colapsadas, categorías y demora del muestreador"""
+
+    def __init__(self, nombre: str, hilos: Optional[Set[int]] = None):
+        self.id = f"{time.strftime('%Y%m%dT%H%M%S')}-{nombre}-{uuid.uuid4().hex[:6]}"
+        self.nombre = nombre
+        self.hilos = hilos  # idents de los hilos a muestrear; None = todo el proceso
+        self.inicio = time.time()
+        self.fin: Optional[float] = None
+        self.stacks: Counter = Counter()
+        self.categorias: Counter = Counter()
+        self.muestras = 0
+        self.lags: List[float] = []
+        self.concurrencia: List[int] = []
+
+    def resumen(self, interval: float) -> dict:
+        lags = sorted(self.lags)
+        return {
+            "id": self.id,
+            "name": self.nombre,
+            "duration_s": round((self.fin or time.time()) - self.inicio, 3),
+            "samples": self.muestras,
+            "scope": "process" if self.hilos is None else "request",
+            "interval_ms": interval * 1000,
+            "categories": dict(self.categorias.most_common()),
+            # Demora del muestreador en despertar: con el GIL ocupado crece por encima de 0
+            "contention": {
+                "sampler_lag_avg_ms": round(sum(lags) / len(lags) * 1000, 2) if lags else 0.0,
+                "sampler_lag_p95_ms": round(lags[int(len(lags) * 0.95)] * 1000, 2) if lags else 0.0,
+                "sampler_lag_max_ms": round(lags[-1] * 1000, 2) if lags else 0.0,
+                # Hilos ocupados en todo el proceso (compiten por el GIL aunque no sean del request)
+                "avg_busy_threads": round(sum(self.concurrencia) / len(self.concurrencia), 2)
+                if self.concurrencia else 0.0,
+            },
+            "torch_threads": torch_threads(),
+        }
+
+    def collapsed(self) -> str:
+        """Formato 'hilo;frame;frame N' (flamegraph.pl, speedscope, inferno)"""
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+
+class SamplingProfiler:
+    """
+    Profiler por muestreo de pilas (sys._current_frames) en un hilo aparte.
+    El hilo solo existe mientras hay capturas activas, así que dejarlo armado no cuesta nada;
+    durante una captura se toman solo las pilas de hilos que están ejecutando código de app/.
+    Las capturas de un request solo cuentan su hilo y los que se le sumen con `en_captura`;
+    las globales, todos.
+    Los artefactos (.folded y .json) quedan en `directory`.
+    """
+
+    def __init__(self, directory: str, interval: float = 0.01, max_active: int = 4, keep: int = 50):
+        self.directory = directory
+        self.interval = interval
+        self.max_active = max_active
+        self.keep = keep
+        self._activas: Dict[str, Captura] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def iniciar(self, nombre: str, hilos: Optional[Set[int]] = None) -> Optional[Captura]:
+        """Abre una captura de los hilos `hilos` (None = todos); None si ya hay `max_active` en curso"""
+        with self._lock:
+            if len(self._activas) >= self.max_active:
+                return None
+            captura = Captura(nombre, hilos)
+            self._activas[captura.id] = captura
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="rag-profiler", daemon=True)
+                self._thread.start()
+            return captura
+
+    def detener(self, captura: Captura) -> dict:
+        with self._lock:
+            self._activas.pop(captura.id, None)
+        captura.fin = time.time()
+        resumen = captura.resumen(self.interval)
+        self._guardar(captura, resumen)
+        print(f"[PERF] Perfil {captura.id}: {captura.muestras} muestras | {resumen['categories']}")
+        return resumen
+
+    @contextmanager
+    def capturar(self, nombre: str):
+        """Captura del hilo actual (y de las tareas que lance envueltas con `en_captura`)"""
+        captura = self.iniciar(nombre, {threading.get_ident()})
+        token = _captura_actual.set(captura)
+        try:
+            yield captura
+        finally:
+            _captura_actual.reset(token)
+            if captura is not None:
+                self.detener(captura)
+
+    def iniciar_global(self, segundos: float) -> Optional[Captura]:
+        """Captura de todo el proceso durante `segundos` (se cierra sola)"""
+        captura = self.iniciar("global")
+        if captura is not None:
+            timer = threading.Timer(segundos, self.detener, args=(captura,))
+            timer.daemon = True
+            timer.start()
+        return captura
+
+    def _run(self):
+        propio = threading.get_ident()
+        siguiente = time.perf_counter() + self.interval
+        while True:
+            time.sleep(max(siguiente - time.perf_counter(), 0))
+            lag = max(time.perf_counter() - siguiente, 0.0)
+            siguiente = time.perf_counter() + self.interval
+
+            with self._lock:
+                if not self._activas:
+                    self._thread = None
+                    return
+
+            nombres = {t.ident: t.name for t in threading.enumerate()}
+            muestras = []
+            for ident, frame in sys._current_frames().items():
+                if ident == propio:
+                    continue
+                codigos = []
+                while frame is not None:
+                    codigos.append(frame.f_code)
+                    frame = frame.f_back
+                archivos = [c.co_filename for c in reversed(codigos)]
+                if not any(a.startswith(APP_DIR) for a in archivos):
+                    continue  # hilo ocioso o ajeno a la app
+                stack = ";".join([_hilo(nombres.get(ident, str(ident)))] + [_frame(c) for c in reversed(codigos)])
+                muestras.append((ident, stack, _categoria(archivos)))
+
+            with self._lock:
+                for captura in self._activas.values():
+                    captura.muestras += 1
+                    captura.lags.append(lag)
+                    captura.concurrencia.append(len(muestras))
+                    hilos = captura.hilos
+                    for ident, stack, categoria in muestras:
+                        if hilos is None or ident in hilos:
+                            captura.stacks[stack] += 1
+                            captura.categorias[categoria] += 1
+
+    def en_captura(self, fn: Callable) -> Callable:
+        """
+        Envuelve una tarea que se ejecuta en otro hilo (ej: el executor del LLM) para que
+        ese hilo cuente en la captura del request que la lanza mientras dura la tarea.
+        """
+        captura = _captura_actual.get()
+        if captura is None:
+            return fn
+
+        def tarea(*args, **kwargs):
+            ident = threading.get_ident()
+            with self._lock:
+                captura.hilos.add(ident)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    captura.hilos.discard(ident)
+
+        return tarea
+
+    def _guardar(self, captura: Captura, resumen: dict):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, f"{captura.id}.folded"), 'w') as f:
+                f.write(captura.collapsed())
+            with open(os.path.join(self.directory, f"{captura.id}.json"), 'w') as f:
+                json.dump(resumen, f)
+            self._podar()
+        except OSError as e:
+            print(f"[ERROR] No se pudo guardar el perfil {captura.id}: {e}")
+
+    def _podar(self):
+        """Conserva solo los últimos `keep` perfiles"""
+        for perfil in self.listar()[self.keep:]:
+            for ext in (".folded", ".json"):
+                try:
+                    os.remove(os.path.join(self.directory, perfil + ext))
+                except FileNotFoundError:
+                    pass
+
+    def listar(self) -> List[str]:
+        """Ids de los perfiles guardados, del más nuevo al más viejo"""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted((f[:-5] for f in os.listdir(self.directory) if f.endswith(".json")), reverse=True)
+
+    def leer(self, perfil_id: str, formato: str = "json") -> Optional[str]:
+        if os.path.basename(perfil_id) != perfil_id:
+            return None
+        path = os.path.join(self.directory, f"{perfil_id}.{'folded' if formato == 'folded' else 'json'}")
+        try:
+            with open(path, 'r') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def activas(self) -> List[str]:
+        with self._lock:
+            return list(self._activas)
@@ -0,0 +1,139 @@
+import hashlib
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """
+    Plantilla en tres partes, siempre en este orden: instrucciones fijas (prefijo idéntico
+    byte a byte entre consultas, reutilizable por caches de prefijo/KV), contexto y pregunta.
+    """
+    nombre: str
+    instrucciones: str
+    formato_contexto: str
+    formato_pregunta: str
+
+    @property
+    def prefix_hash(self) -> str:
+        return hashlib.sha256(self.instrucciones.encode("utf-8")).hexdigest()[:12]
+
+    def mensajes(self, context: str, question: str) -> List[dict]:
+        """Mensajes del chat: el prefijo va solo en el system y la pregunta se envía una vez"""
+        return [
+            {"role": "system", "content": self.instrucciones},
+            {"role": "user", "content": self.formato_contexto.format(context=context)
+                                        + self.formato_pregunta.format(question=question)}
+        ]
+
+
+PLANTILLAS: Dict[str, PromptTemplate] = {
+    "es": PromptTemplate(
+        nombre="es",
+        instrucciones=(
+            "Eres un asistente especializado en fútbol. Responde **únicamente** lo que se te pregunta, de forma clara y concisa, "
+            "usando solo el CONTEXTO que envía el usuario.\n\n"
+            "INSTRUCCIONES ESTRICTAS:\n"
+            "1. **Responde directamente a la pregunta del usuario**, sin saludos, despedidas o comentarios adicionales.\n"
+            "2. **Si preguntan por un equipo específico**:\n"
+            "   - Indica solo si juega hoy (Sí/No).\n"
+            "   - Si juega, muestra: '[EQUIPO] vs [RIVAL] - [LIGA] a las [HORA]'.\n"
+            "3. **Si preguntan por partidos en general**:\n"
+            "   - Lista todos los partidos agrupados por hora con el formato: '⚽ [LOCAL] vs [VISITANTE] - [LIGA]'.\n"
+            "4. **Prohibido**:\n"
+            "   - Adjetivos emocionales, repeticiones, información irrelevante o superar 200 tokens.\n"
+            "5. **Si el contexto incluye marcador o minuto** y preguntan por resultados, inclúyelos tal cual."
+        ),
+        formato_contexto="CONTEXTO (partidos de hoy):\n{context}\n\n",
+        formato_pregunta="PREGUNTA DEL USUARIO:\n{question}\n\nRESPUESTA (solo lo necesario):"
+    ),
+    "en": PromptTemplate(
+        nombre="en",
+        instrucciones=(
+            "You are a football assistant. Answer **only** what is asked, clearly and concisely, "
+            "using only the CONTEXT sent by the user.\n\n"
+            "STRICT INSTRUCTIONS:\n"
+            "1. **Answer the user's question directly**, with no greetings, sign-offs or extra comments.\n"
+            "2. **If they ask about a specific team**:\n"
+            "   - Say only whether it plays today (Yes/No).\n"
+            "   - If it plays, show: '[TEAM] vs [OPPONENT] - [LEAGUE] at [TIME]'.\n"
+            "3. **If they ask about matches in general**:\n"
+            "   - List every match grouped by time using: '⚽ [HOME] vs [AWAY] - [LEAGUE]'.\n"
+            "4. **Forbidden**:\n"
+            "   - Emotional adjectives, repetition, irrelevant information or more than 200 tokens.\n"
+            "5. **If the context includes a score or minute** and they ask about results, include it as is."
+        ),
+        formato_contexto="CONTEXT (today's matches):\n{context}\n\n",
+        formato_pregunta="USER QUESTION:\n{question}\n\nANSWER (only what is needed):"
+    ),
+}
+
+# Mensajes fijos del motor por idioma
+MENSAJES = {
+    "es": {
+        "sin_resultados": "No encontré información relevante.",
+        "degradado": "⚠️ El asistente está demorado; estos son los partidos encontrados:",
+    },
+    "en": {
+        "sin_resultados": "I couldn't find relevant information.",
+        "degradado": "⚠️ The assistant is running late; these are the matches found:",
+    },
+}
+
+
+def plantilla(nombre: str) -> PromptTemplate:
+    """Plantilla por nombre (o idioma); cae en español si no existe"""
+    return PLANTILLAS.get(nombre, PLANTILLAS["es"])
+
+
+def mensaje(idioma: str, clave: str) -> str:
+    return MENSAJES.get(idioma, MENSAJES["es"])[clave]
+
+
+def estimar_tokens(texto: str) -> int:
+    """Estimación barata (~4 caracteres por token) para seguir el tamaño sin tokenizer"""
+    return (len(texto) + 3) // 4
+
+
+class PromptStats:
+    """Contabilidad de tokens por plantilla: estimada antes de enviar y real según `usage`"""
+
+    CAMPOS = ("requests", "prefix_tokens_est", "context_tokens_est", "question_tokens_est",
+              "prompt_tokens", "completion_tokens", "cached_tokens")
+
+    def __init__(self):
+        self._data: Dict[str, Dict[str, int]] = {}
+        self._prefixes: Dict[str, set] = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, template: PromptTemplate, context: str, question: str,
+                  usage: Optional[dict] = None):
+        usage = usage or {}
+        cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+        with self._lock:
+            stats = self._data.setdefault(template.nombre, dict.fromkeys(self.CAMPOS, 0))
+            stats["requests"] += 1
+            stats["prefix_tokens_est"] += estimar_tokens(template.instrucciones)
+            stats["context_tokens_est"] += estimar_tokens(context)
+            stats["question_tokens_est"] += estimar_tokens(question)
+            stats["prompt_tokens"] += usage.get("prompt_tokens") or 0
+            stats["completion_tokens"] += usage.get("completion_tokens") or 0
+            stats["cached_tokens"] += cached
+            # Hash del prefijo enviado: permite comparar entre workers/deploys que sea el mismo
+            self._prefixes.setdefault(template.nombre, set()).add(template.prefix_hash)
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            resultado = {}
+            for nombre, stats in self._data.items():
+                n = stats["requests"] or 1
+                resultado[nombre] = {
+                    **stats,
+                    "avg_prompt_tokens": round(stats["prompt_tokens"] / n, 1),
+                    "avg_context_tokens_est": round(stats["context_tokens_est"] / n, 1),
+                    "cached_ratio": round(stats["cached_tokens"] / stats["prompt_tokens"], 3)
+                    if stats["prompt_tokens"] else 0.0,
+                    "prefix_hashes": sorted(self._prefixes.get(nombre, ())),
+                }
+            return resultado
@@ -1,39 +1,95 @@
 import os
-import json
 import requests
 import threading
-from datetime import datetime, date
-from collections import OrderedDict
+from datetime import date, datetime
 from dotenv import load_dotenv
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional, Iterator, Tuple
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 from pydantic import BaseModel
 from app.embeddings import EmbeddingGenerator
+from app.cache import CacheBackend, build_cache_backend
+from app.indexing import IndexStore, IndexLockedError, build_index
+from app.live import ESTADOS_FINALIZADOS, LiveFixtureStore, LivePoller
+from app.fixtures import FixtureTable
+from app.tenants import TenantConfig, DEFAULT_TENANT, cargar_tenants, ligas_indexadas
+from app.prompts import PromptStats, plantilla, mensaje
+from app.shards import ShardedVectorStore, buscar_por_vectores
+from app.profiling import SamplingProfiler
 
 # Cargar variables de entorno
 load_dotenv()
 
+# Después de este tiempo desde el inicio un partido se da por terminado (alargue y penales incluidos)
+DURACION_PARTIDO = 3 * 3600
+
+class LLMError(RuntimeError):
+    """El LLM no pudo generar la respuesta (timeout o error del proveedor)"""
+
 class RAGConfig(BaseModel):
     """Configuración del motor RAG"""
-    index_path: Optional[str] = None
+    index_path: Optional[str] = None  # índice fijo, sin versionado
+    store_dir: Optional[str] = None  # directorio de índices versionados (por defecto vector_store/)
+    auto_regenerate: bool = os.getenv("RAG_AUTO_REGENERATE", "false").lower() == "true"
+    reload_interval: int = 60
     max_results: int = 3
-    cache_size: int = 100
+    cache_size: int = 100  # caché en memoria (por proceso)
+    shared_cache_size: int = int(os.getenv("RAG_SHARED_CACHE_SIZE", "10000"))  # caché SQLite (todos los workers)
+    cache_backend: str = os.getenv("RAG_CACHE_BACKEND", "sqlite")  # "memory" o "sqlite" (compartida)
+    cache_path: Optional[str] = None
+    cache_ttl: Optional[int] = 3600
     llm_model: str = "google/gemma-3n-e4b-it"
     llm_temperature: float = 0.2
     llm_timeout: int = 10
+    batch_concurrency: int = 4
+    # Marcadores en vivo: se leen de vector_store/live.json, que escribe un único poller
+    # (`run_embeddings live`); live_poll_in_process lo corre dentro de este proceso (despliegues de uno solo)
+    live_updates: bool = os.getenv("RAG_LIVE_UPDATES", "false").lower() == "true"
+    live_poll_in_process: bool = os.getenv("RAG_LIVE_POLL_IN_PROCESS", "false").lower() == "true"
+    live_poll_interval: int = 30
+    live_cache_ttl: int = 30  # respuestas con marcadores en vivo o partidos por empezar: vencen rápido
+    tenants_file: Optional[str] = None  # por defecto tenants.json o RAG_TENANTS_FILE
+    llm_soft_deadline: float = 5.0  # pasado este tiempo se responde en modo degradado
+    llm_workers: int = 8
+    # Búsqueda distribuida: URLs de los shards (ver `run_embeddings serve-shards`); vacío = índice local
+    shard_urls: List[str] = [u for u in os.getenv("RAG_SHARD_URLS", "").split(",") if u.strip()]
+    shard_timeout: float = 2.0
+    profiling: bool = os.getenv("RAG_PROFILING", "false").lower() == "true"  # habilita X-Profile
+    # X-Profile y /admin/* exigen el header X-Admin-Token con este valor; sin token quedan deshabilitados
+    admin_token: Optional[str] = os.getenv("RAG_ADMIN_TOKEN") or None
+    profile_interval: float = 0.01
 
 class RAGEngine:
     def __init__(self, config: Optional[RAGConfig] = None, embedding_device='cpu'):
         self.config = config or RAGConfig()
         self.embedding_generator =  EmbeddingGenerator(device=embedding_device)
-        self.index_path = self.config.index_path or os.path.join(
-            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
-            "vector_store",
-            "faiss_index"
-        )
-        self.index_metadata_path = os.path.join(os.path.dirname(self.index_path), "metadata.json")
+        self.store = IndexStore(self.config.store_dir)
+        self.index_path = self.config.index_path or self.store.current_path()
+        self.index_version = None
         self.vector_store = None
+        self.fixtures = FixtureTable()
+        self.tenants: Dict[str, TenantConfig] = cargar_tenants(self.config.tenants_file)
         self.last_update_date = None
-        self._query_cache: OrderedDict[str, dict] = OrderedDict()
+        self._last_reload_check = 0.0
+        self._load_lock = threading.Lock()
+        self._query_cache: CacheBackend = build_cache_backend(
+            self.config.cache_backend,
+            max_size=self.config.cache_size,
+            shared_max_size=self.config.shared_cache_size,
+            ttl=self.config.cache_ttl,
+            path=self.config.cache_path or os.path.join(self.store.base_dir, "query_cache.sqlite")
+        )
+        self.prompt_stats = PromptStats()
+        self._llm_executor = ThreadPoolExecutor(max_workers=self.config.llm_workers)
+        self._llm_pending = {}  # clave de caché -> llamada al LLM aún en curso
+        self._pending_lock = threading.Lock()
+        self.shards = ShardedVectorStore(self.config.shard_urls, self.config.shard_timeout) \
+            if self.config.shard_urls else None
+        self.profiler = SamplingProfiler(os.path.join(self.store.base_dir, "profiles"),
+                                         interval=self.config.profile_interval)
+        self.live_store = LiveFixtureStore(self.store.live_path if self.config.live_updates else None)
+        self.live_poller = LivePoller(self.live_store, interval=self.config.live_poll_interval)
+        if self.config.live_updates and self.config.live_poll_in_process:
+            self.live_poller.start()
         self._initialize_async()
 
     def _initialize_async(self):
@@ -42,89 +98,157 @@ class RAGEngine:
         init_thread.start()
 
     def _load_or_regenerate_index(self):
-        """Carga o regenera el índice según necesidad"""
+        """Carga la versión vigente; solo construye si auto_regenerate está activo"""
         try:
-            if os.path.exists(self.index_path) and self._is_index_current():
-                self._load_index()
-            else:
-                self._regenerate_index()
+            if self.config.auto_regenerate and not self.config.index_path:
+                try:
+                    build_index(self.embedding_generator, self.store, force=False,
+                                ligas=ligas_indexadas(self.tenants))
+                except IndexLockedError as e:
+                    # Otro proceso ya está construyendo: se usa la versión vigente
+                    print(f"[INFO] {e}")
+            self.load_index()
         except Exception as e:
             print(f"[ERROR] Error inicializando índice: {e}")
 
-    def _is_index_current(self) -> bool:
-        """Verifica si el índice es del día actual"""
-        try:
-            if not os.path.exists(self.index_metadata_path):
-                return False
-                
-            with open(self.index_metadata_path, 'r') as f:
-                metadata = json.load(f)
-                self.last_update_date = datetime.strptime(metadata['last_update'], '%Y-%m-%d').date()
-                return self.last_update_date == date.today()
-        except Exception:
-            return False
-
-    def _load_index(self):
-        """Carga optimizada del índice FAISS"""
+    def load_index(self):
+        """Carga (o recarga) la versión vigente del índice FAISS en modo solo lectura"""
         from time import time
         start = time()
-        
-        try:
-            self.vector_store = self.embedding_generator.load_saved_index(self.index_path)
-            print(f"[PERF] Índice cargado en {time()-start:.2f}s | Documentos: {self.vector_store.index.ntotal}")
-        except Exception as e:
-            print(f"[ERROR] Error cargando índice: {e}")
-            self.vector_store = None
 
-    def _regenerate_index(self):
-        """Regeneración optimizada del índice"""
+        with self._load_lock:
+            self._last_reload_check = start
+            metadata = {}
+            if self.config.index_path:
+                path = self.config.index_path
+                version = f"fijo-{int(os.path.getmtime(path))}" if os.path.exists(path) else None
+            else:
+                metadata = self.store.read_metadata()
+                version = metadata.get("current")
+                path = self.store.version_path(version) if version else None
+
+            if not path or not version:
+                print("[INFO] Todavía no hay un índice publicado (ver app/run_embeddings.py)")
+                return
+
+            # Con shards, los vectores viven en los procesos shard: acá solo la tabla de partidos
+            try:
+                vector_store = self.embedding_generator.load_saved_index(path) if self.shards is None else None
+            except Exception as e:
+                print(f"[ERROR] Error cargando índice: {e}")
+                return
+
+            fixtures_path = os.path.join(path, "fixtures.json")
+            self.fixtures = FixtureTable.load(fixtures_path) if os.path.exists(fixtures_path) else FixtureTable()
+            self.vector_store = vector_store
+            self.index_path = path
+            self.index_version = version
+            if metadata.get("last_update"):
+                self.last_update_date = datetime.strptime(metadata["last_update"], '%Y-%m-%d').date()
+            self._query_cache.set_version(version)
+            documentos = vector_store.index.ntotal if vector_store else f"{len(self.config.shard_urls)} shards"
+            print(f"[PERF] Índice {version} cargado en {time()-start:.2f}s | Documentos: {documentos}")
+
+    def _maybe_reload(self):
+        """Cada reload_interval segundos verifica si el worker publicó una versión nueva"""
         from time import time
-        start = time()
-        
-        try:
-            self.vector_store = self.embedding_generator.generate_embeddings_from_api(self.index_path)
-            
-            metadata = {
-                'last_update': date.today().isoformat(),
-                'source': 'api-football',
-                'documents': self.vector_store.index.ntotal if self.vector_store else 0
-            }
-            with open(self.index_metadata_path, 'w') as f:
-                json.dump(metadata, f)
-                
-            self.last_update_date = date.today()
-            print(f"[PERF] Índice regenerado en {time()-start:.2f}s | Documentos: {metadata['documents']}")
-        except Exception as e:
-            print(f"[ERROR] Error regenerando índice: {e}")
-            raise
+        if self.config.index_path or time() - self._last_reload_check < self.config.reload_interval:
+            return
+        self._last_reload_check = time()
+        if self.store.current_version() != self.index_version:
+            self.load_index()
+
+    def _ensure_index(self) -> bool:
+        """Garantiza que haya un índice cargado (y actualizado) antes de buscar"""
+        if self.shards is not None:
+            # Los shards se recargan solos; acá se sigue la versión para la caché y los partidos
+            if self.index_version is None:
+                self.load_index()
+            else:
+                self._maybe_reload()
+            return True
+        if not self.vector_store:
+            self.load_index()
+        else:
+            self._maybe_reload()
+        return self.vector_store is not None
+
+    def get_tenant(self, nombre: Optional[str] = None) -> TenantConfig:
+        """Configuración del tenant (región/idioma); KeyError si no existe"""
+        tenant = self.tenants.get(nombre or DEFAULT_TENANT)
+        if tenant is None:
+            raise KeyError(f"Tenant desconocido: {nombre}")
+        return tenant
+
+    def _cache_key(self, question: str, tenant: TenantConfig) -> str:
+        # El día local va en la clave: a la medianoche del tenant cambia el "hoy" de la respuesta
+        return f"{tenant.nombre}|{tenant.hoy().isoformat()}|{question.lower().strip()}"
+
+    def _juega_el_dia(self, metadata: dict, tz: str, dia: date) -> bool:
+        """Algún partido del documento es del día local `dia` (sin tabla de partidos, no descarta)"""
+        fixture_ids = metadata.get("fixture_ids")
+        if not fixture_ids or not len(self.fixtures):
+            return True
+        fixtures = [self.fixtures.get(fid) for fid in fixture_ids]
+        if any(f is None for f in fixtures):
+            return True
+        return any(f.fecha_local(tz) == dia for f in fixtures)
+
+    def _filtro_tenant(self, tenant: TenantConfig) -> Tuple[set, Callable[[dict], bool]]:
+        """
+        Filtro de candidatos para el tenant: sus ligas y su día local. El índice guarda varios
+        días ARG (los que cubren el hoy de cada tenant, o un backfill); match_date descarta los
+        chunks de otros días y la tabla de partidos los que no tienen ningún partido de hoy.
+        """
+        hoy = tenant.hoy()
+        fechas = tenant.fechas_indice(hoy)
+        return fechas, lambda metadata: tenant.admite(metadata, fechas) \
+            and self._juega_el_dia(metadata, tenant.timezone, hoy)
 
     def _add_to_cache(self, query: str, result: dict):
-        """Manejo optimizado de caché LRU"""
-        if len(self._query_cache) >= self.config.cache_size:
-            self._query_cache.popitem(last=False)
-        self._query_cache[query.lower().strip()] = result
+        """Guarda la respuesta en el backend de caché configurado"""
+        if result.get("degraded") or result.get("error") or result.get("partial"):
+            # Nunca se cachean respuestas degradadas, errores ni búsquedas con shards caídos
+            return
+        ttl = self.config.live_cache_ttl if result.get("live") else None
+        self._query_cache.set(query, result, ttl=ttl)
 
-    def search_documents(self, query: str, k: Optional[int] = None) -> List[dict]:
-        """Búsqueda semántica optimizada con caché"""
-        if not self.vector_store:
-            self._load_index()
-            if not self.vector_store:
-                return []
+    def search_documents(self, query: str, k: Optional[int] = None,
+                         tenant: Optional[TenantConfig] = None) -> List[dict]:
+        """Búsqueda semántica optimizada, filtrada por las ligas del tenant"""
+        try:
+            return self._buscar(query, k, tenant)[0]
+        except Exception as e:
+            print(f"[ERROR] Búsqueda fallida: {e}")
+            return []
+
+    def _buscar(self, query: str, k: Optional[int] = None,
+                tenant: Optional[TenantConfig] = None) -> Tuple[list, bool]:
+        """Documentos y si la búsqueda fue completa (con shards, si respondieron todos). Propaga errores."""
+        if not self._ensure_index():
+            return [], True
 
         k = k or self.config.max_results
+        tenant = tenant or self.get_tenant()
+        fechas, admite = self._filtro_tenant(tenant)
         
         from time import time
         start = time()
         
-        try:
-            resultados = self.vector_store.similarity_search(query, k=k)
-            print(f"[PERF] Búsqueda '{query[:20]}...' en {time()-start:.2f}s | Resultados: {len(resultados)}")
-            return resultados
-        except Exception as e:
-            print(f"[ERROR] Búsqueda fallida: {e}")
-            return []
+        completa = True
+        if self.shards is not None:
+            # Los shards filtran por liga y match_date; el día local exacto se mira acá
+            vector = self.embedding_generator.get_embedding_model().embed_query(query)
+            resultados, completa = self.shards.search([vector], k * 2, tenant.ligas_set, fechas)
+            resultados = [doc for doc in resultados[0] if admite(doc.metadata)][:k]
+        else:
+            resultados = self.vector_store.similarity_search(
+                query, k=k, filter=admite, fetch_k=max(20, k * 10)
+            )
+        print(f"[PERF] Búsqueda '{query[:20]}...' en {time()-start:.2f}s | Resultados: {len(resultados)}")
+        return resultados, completa
 
-    def generate_response(self, context: str, question: str) -> str:
+    def generate_response(self, context: str, question: str, tenant: Optional[TenantConfig] = None) -> str:
         """Generación optimizada de respuestas con LLM"""
         api_key = os.getenv("OPENROUTER_API_KEY")
         if not api_key:
@@ -137,33 +261,18 @@ class RAGEngine:
             "X-Title": "Fútbol RAG"
         }
 
-# En generate_response(), ajustar el prompt:
-        prompt = (
-            "Eres un asistente especializado en fútbol. Responde **únicamente** lo que se te pregunta, de forma clara y concisa.\n\n"
-            f"CONTEXTO (partidos de hoy):\n{context}\n\n"
-            "INSTRUCCIONES ESTRICTAS:\n"
-            "1. **Responde directamente a la pregunta del usuario**, sin saludos, despedidas o comentarios adicionales.\n"
-            "2. **Si preguntan por un equipo específico**:\n"
-            "   - Indica solo si juega hoy (Sí/No).\n"
-            "   - Si juega, muestra: '[EQUIPO] vs [RIVAL] - [LIGA] a las [HORA]'.\n"
-            "3. **Si preguntan por partidos en general**:\n"
-            "   - Lista todos los partidos agrupados por hora con el formato: '⚽ [LOCAL] vs [VISITANTE] - [LIGA]'.\n"
-            "4. **Prohibido**:\n"
-            "   - Adjetivos emocionales, repeticiones, información irrelevante o superar 200 tokens.\n\n"
-            f"PREGUNTA DEL USUARIO:\n{question}\n\n"
-            "RESPUESTA (solo lo necesario):"
-        )
-
+        # Prefijo fijo (system) + contexto + pregunta (una sola vez): los proveedores
+        # con cache de prefijo reutilizan las instrucciones entre consultas
+        tenant = tenant or self.get_tenant()
+        template = plantilla(tenant.plantilla or tenant.idioma)
 
         payload = {
             "model": self.config.llm_model,
-            "messages": [
-                {"role": "system", "content": prompt},
-                {"role": "user", "content": question}
-            ],
+            "messages": template.mensajes(context, question),
             "temperature": self.config.llm_temperature,
             "max_tokens": 500,
-            "top_p": 0.9
+            "top_p": 0.9,
+            "usage": {"include": True}
         }
 
         try:
@@ -174,12 +283,14 @@ class RAGEngine:
                 timeout=self.config.llm_timeout
             )
             response.raise_for_status()
-            return response.json()['choices'][0]['message']['content']
+            data = response.json()
+            self.prompt_stats.registrar(template, context, question, data.get("usage"))
+            return data['choices'][0]['message']['content']
         except requests.exceptions.Timeout:
-            return "Error: Tiempo de espera agotado al generar respuesta"
+            raise LLMError("Tiempo de espera agotado al generar respuesta")
         except Exception as e:
             print(f"[ERROR] OpenRouter: {e}")
-            return f"Error al generar respuesta: {str(e)}"
+            raise LLMError(f"Error al generar respuesta: {str(e)}")
 
     def _clean_response(self, text: str) -> str:
         """Limpieza optimizada de la respuesta"""
@@ -192,57 +303,284 @@ class RAGEngine:
                 unique_lines.append(line)
         return "\n".join(unique_lines)
 
-    def query(self, question: str, use_cache: bool = True) -> dict:
-        """Pipeline completo optimizado"""
-        # Verificar caché primero
-        cache_key = question.lower().strip()
-        if use_cache and cache_key in self._query_cache:
-            return self._query_cache[cache_key]
+    def _render_doc(self, doc, tenant: TenantConfig, hoy: date) -> Tuple[str, bool]:
+        """
+        Texto del documento para el tenant: solo los partidos de su día local `hoy`, con
+        horarios en su zona horaria (desde la tabla compacta de partidos) y marcador/minuto/
+        estado en vivo en cada línea.
+        """
+        fixture_ids = doc.metadata.get("fixture_ids")
+        if not fixture_ids:
+            return doc.page_content, False
 
-        try:
-            # Búsqueda semántica
-            docs = self.search_documents(question)
-            
-            if not docs:
-                result = {
-                    "question": question,
-                    "answer": "No encontré información relevante.",
-                    "docs_used": [],
-                    "cache_hit": False
-                }
-                self._add_to_cache(cache_key, result)
-                return result
+        fixtures = [self.fixtures.get(fid) for fid in fixture_ids] if len(self.fixtures) else []
+        if fixtures and all(f is not None for f in fixtures):
+            lines = [f.formatear(tenant.timezone, tenant.etiqueta_hora) for f in fixtures]
+            # Un chunk es un día ARG: puede traer partidos de otro día local del tenant
+            del_dia = [f.fecha_local(tenant.timezone) == hoy for f in fixtures]
+        else:
+            lines = doc.page_content.split("\n")
+            if len(lines) != len(fixture_ids):
+                return doc.page_content, False
+            del_dia = [True] * len(lines)
 
-            # Generar contexto
-            context = "\n".join(doc.page_content for doc in docs[:5])  # Limitar a 3 docs
-            
-            # Generar respuesta
-            respuesta = self.generate_response(context, question)
-            
-            # Procesar resultado
-            result = {
+        live = False
+        for i, fixture_id in enumerate(fixture_ids):
+            score = self.live_store.get(fixture_id)
+            if score is not None and del_dia[i]:
+                lines[i] = f"{lines[i]} | {score.formatear()}"
+                live = True
+        return "\n".join(line for line, incluir in zip(lines, del_dia) if incluir), live
+
+    def _build_context(self, docs: list, tenant: TenantConfig) -> Tuple[str, bool]:
+        """Arma el contexto para el LLM a partir de los documentos recuperados"""
+        hoy = tenant.hoy()
+        partes = [self._render_doc(doc, tenant, hoy) for doc in docs[:5]]  # Limitar a 5 docs
+        return "\n".join(texto for texto, _ in partes if texto), any(live for _, live in partes)
+
+    def _partidos_abiertos(self, docs: list) -> bool:
+        """
+        Algún partido del contexto puede cambiar antes de que venza la caché normal:
+        empieza dentro de cache_ttl o ya empezó y todavía no terminó.
+        """
+        from time import time
+        ahora = time()
+        ventana = self.config.cache_ttl if self.config.cache_ttl is not None else float("inf")
+        for doc in docs[:5]:
+            for fixture_id in doc.metadata.get("fixture_ids") or []:
+                score = self.live_store.get(fixture_id)
+                if score is not None:
+                    if score.estado not in ESTADOS_FINALIZADOS:
+                        return True
+                    continue
+                fixture = self.fixtures.get(fixture_id)
+                if fixture is not None and fixture.kickoff - ventana <= ahora < fixture.kickoff + DURACION_PARTIDO:
+                    return True
+        return False
+
+    def _result(self, question: str, docs: list, answer: str, live: bool, degraded: bool = False) -> dict:
+        # live también con partidos por empezar o en juego: la respuesta vence con live_cache_ttl
+        live = live or self._partidos_abiertos(docs)
+        return {
+            "question": question,
+            "answer": answer,
+            "docs_used": [{"content": doc.page_content[:200]+"..." if len(doc.page_content) > 200 else doc.page_content,
+                          "metadata": doc.metadata} for doc in docs[:3]],
+            "cache_hit": False,
+            "live": live,
+            "degraded": degraded
+        }
+
+    def _answer_from_docs(self, question: str, docs: list, tenant: TenantConfig,
+                          cache_key: Optional[str] = None) -> dict:
+        """
+        Genera la respuesta final a partir de documentos ya recuperados.
+        Si el LLM no responde antes de llm_soft_deadline se devuelve el listado de partidos
+        recuperados (degradado) y el LLM sigue en segundo plano para llenar la caché.
+        """
+        if not docs:
+            return {
                 "question": question,
-                "answer": self._clean_response(respuesta),
-                "docs_used": [{"content": doc.page_content[:200]+"..." if len(doc.page_content) > 200 else doc.page_content,
-                              "metadata": doc.metadata} for doc in docs[:3]],
+                "answer": mensaje(tenant.idioma, "sin_resultados"),
+                "docs_used": [],
                 "cache_hit": False
             }
 
+        # Generar respuesta
+        context, live = self._build_context(docs, tenant)
+        future = self._submit_llm(context, question, tenant, cache_key, docs, live)
+        try:
+            respuesta = future.result(timeout=self.config.llm_soft_deadline)
+        except FutureTimeout:
+            print(f"[PERF] LLM superó {self.config.llm_soft_deadline}s: respuesta degradada para '{question[:20]}...'")
+            return self._result(question, docs, self._degraded_answer(context, tenant), live, degraded=True)
+        except Exception as e:
+            print(f"[ERROR] LLM no disponible, respuesta degradada: {e}")
+            return self._result(question, docs, self._degraded_answer(context, tenant), live, degraded=True)
+
+        return self._result(question, docs, self._clean_response(respuesta), live)
+
+    def _submit_llm(self, context: str, question: str, tenant: TenantConfig,
+                    cache_key: Optional[str], docs: list, live: bool):
+        """
+        Lanza la llamada al LLM; si ya hay una en curso para la misma pregunta, la reutiliza.
+        Al terminar, la respuesta se guarda en caché aunque haya llegado tarde. Si el request
+        se está perfilando, el hilo del executor entra en su captura.
+        """
+        generar = self.profiler.en_captura(self.generate_response)
+        if not cache_key:
+            return self._llm_executor.submit(generar, context, question, tenant)
+        with self._pending_lock:
+            future = self._llm_pending.get(cache_key)
+            if future is None:
+                future = self._llm_executor.submit(generar, context, question, tenant)
+                self._llm_pending[cache_key] = future
+                future.add_done_callback(lambda f: self._llm_pending.pop(cache_key, None))
+                future.add_done_callback(
+                    lambda f: self._cache_late_answer(f, cache_key, question, docs, live)
+                )
+            return future
+
+    def _degraded_answer(self, context: str, tenant: TenantConfig) -> str:
+        """Respuesta sin LLM: el listado de partidos recuperados, ya formateado"""
+        return f"{mensaje(tenant.idioma, 'degradado')}\n{self._clean_response(context)}"
+
+    def _cache_late_answer(self, future, cache_key: str, question: str, docs: list, live: bool):
+        """Guarda en caché la respuesta del LLM, también si llegó después del deadline"""
+        try:
+            respuesta = future.result()
+        except Exception:
+            return
+        self._add_to_cache(cache_key, self._result(question, docs, self._clean_response(respuesta), live))
+
+    def _error_result(self, question: str, error: Exception) -> dict:
+        """Resultado estándar ante una falla del pipeline"""
+        print(f"[ERROR] Pipeline RAG: {error}")
+        return {
+            "question": question,
+            "answer": f"Error procesando la pregunta: {str(error)}",
+            "docs_used": [],
+            "cache_hit": False,
+            "error": True
+        }
+
+    def query(self, question: str, use_cache: bool = True, tenant: Optional[str] = None) -> dict:
+        """Pipeline completo optimizado"""
+        config_tenant = self.get_tenant(tenant)
+
+        # Verificar caché primero (compartida entre procesos según el backend)
+        cache_key = self._cache_key(question, config_tenant)
+        if use_cache:
+            cached = self._query_cache.get(cache_key)
+            if cached is not None:
+                cached["cache_hit"] = True
+                return cached
+
+        try:
+            # Búsqueda semántica (un error acá no debe cachearse como "sin resultados")
+            docs, completa = self._buscar(question, tenant=config_tenant)
+            cachear = use_cache and completa
+            result = self._answer_from_docs(question, docs, config_tenant, cache_key if cachear else None)
+            if not completa:
+                result["partial"] = True
+
             # Almacenar en caché
-            if use_cache:
+            if cachear:
                 self._add_to_cache(cache_key, result)
-                result["cache_hit"] = True
 
             return result
 
         except Exception as e:
-            print(f"[ERROR] Pipeline RAG: {e}")
-            return {
-                "question": question,
-                "answer": f"Error procesando la pregunta: {str(e)}",
-                "docs_used": [],
-                "cache_hit": False
+            return self._error_result(question, e)
+
+    def search_documents_many(self, questions: List[str], k: Optional[int] = None,
+                              tenant: Optional[TenantConfig] = None) -> List[list]:
+        """Búsqueda semántica por lotes: un solo encode y una sola llamada a FAISS"""
+        try:
+            return self._buscar_many(questions, k, tenant)[0]
+        except Exception as e:
+            print(f"[ERROR] Búsqueda por lotes fallida: {e}")
+            return [[] for _ in questions]
+
+    def _buscar_many(self, questions: List[str], k: Optional[int] = None,
+                     tenant: Optional[TenantConfig] = None) -> Tuple[List[list], bool]:
+        """Como _buscar, por lotes"""
+        if not self._ensure_index():
+            return [[] for _ in questions], True
+
+        k = k or self.config.max_results
+
+        from time import time
+        import numpy as np
+        start = time()
+
+        vectors = np.asarray(
+            self.embedding_generator.get_embedding_model().embed_documents(questions),
+            dtype=np.float32
+        )
+        if getattr(self.vector_store, "_normalize_L2", False):
+            import faiss
+            faiss.normalize_L2(vectors)
+
+        # Se traen más candidatos y se filtran por liga y día local del tenant
+        tenant = tenant or self.get_tenant()
+        fechas, admite = self._filtro_tenant(tenant)
+        completa = True
+        if self.shards is not None:
+            resultados, completa = self.shards.search(vectors, k * 2, tenant.ligas_set, fechas)
+            resultados = [[doc for doc in fila if admite(doc.metadata)][:k] for fila in resultados]
+        else:
+            resultados = [
+                [doc for doc, _ in fila]
+                for fila in buscar_por_vectores(self.vector_store, vectors, k, admite)
+            ]
+
+        print(f"[PERF] Búsqueda por lotes de {len(questions)} preguntas en {time()-start:.2f}s")
+        return resultados, completa
+
+    def query_many(self, questions: List[str], use_cache: bool = True,
+                   max_workers: Optional[int] = None, tenant: Optional[str] = None) -> Iterator[Tuple[int, dict]]:
+        """
+        Pipeline por lotes: devuelve (posición, resultado) a medida que cada respuesta está lista.
+        Las preguntas repetidas o ya cacheadas no vuelven a pasar por el embedding ni por el LLM.
+        """
+        from concurrent.futures import as_completed
+
+        config_tenant = self.get_tenant(tenant)
+
+        # Agrupar posiciones por pregunta normalizada
+        posiciones: Dict[str, List[int]] = {}
+        originales: Dict[str, str] = {}
+        for i, question in enumerate(questions):
+            key = self._cache_key(question, config_tenant)
+            posiciones.setdefault(key, []).append(i)
+            originales.setdefault(key, question)
+
+        # Resolver primero lo que ya está en caché
+        pendientes = []
+        for key in posiciones:
+            cached = self._query_cache.get(key) if use_cache else None
+            if cached is not None:
+                cached["cache_hit"] = True
+                for i in posiciones[key]:
+                    yield i, cached
+            else:
+                pendientes.append(key)
+
+        if not pendientes:
+            return
+
+        try:
+            docs_por_pregunta, completa = self._buscar_many(
+                [originales[key] for key in pendientes], tenant=config_tenant
+            )
+        except Exception as e:
+            for key in pendientes:
+                result = self._error_result(originales[key], e)
+                for i in posiciones[key]:
+                    yield i, result
+            return
+        cachear = use_cache and completa
+
+        workers = max_workers or self.config.batch_concurrency
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(self._answer_from_docs, originales[key], docs, config_tenant,
+                                key if cachear else None): key
+                for key, docs in zip(pendientes, docs_por_pregunta)
             }
+            for future in as_completed(futures):
+                key = futures[future]
+                try:
+                    result = future.result()
+                    if not completa:
+                        result["partial"] = True
+                    if cachear:
+                        self._add_to_cache(key, result)
+                except Exception as e:
+                    result = self._error_result(originales[key], e)
+                for i in posiciones[key]:
+                    yield i, result
 
 # Ejemplo de uso
 if __name__ == "__main__":
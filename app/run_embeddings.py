@@ -0,0 +1,212 @@
+"""
+Worker de indexación offline, separado de los procesos que sirven consultas.
+
+Uso:
+    python -m app.run_embeddings build              # construye y publica una versión nueva
+    python -m app.run_embeddings refresh            # construye solo si la vigente no cubre el día de cada tenant
+    python -m app.run_embeddings refresh --interval 3600   # idem, en bucle
+    python -m app.run_embeddings verify             # carga la versión vigente y hace una búsqueda de prueba
+    python -m app.run_embeddings stats              # muestra versiones y metadata
+    python -m app.run_embeddings live --interval 30        # único poller de marcadores en vivo
+    python -m app.run_embeddings build --shard-by league   # además reparte el índice en shards
+    python -m app.run_embeddings serve-shard --shard league-03 --port 8101
+    python -m app.run_embeddings serve-shards --port-base 8101   # un proceso por shard (local)
+"""
+import os
+import sys
+import time
+import json
+import signal
+import argparse
+import subprocess
+
+if __package__ in (None, ""):
+    # Permite ejecutarlo también como `python app/run_embeddings.py`
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.indexing import IndexStore, IndexLockedError, build_index
+from app.ingestion import fechas_por_zonas
+from app.tenants import cargar_tenants, ligas_indexadas
+
+
+def _generator(device: str):
+    from app.embeddings import EmbeddingGenerator
+    return EmbeddingGenerator(device=device)
+
+
+def _fechas(args, tenants):
+    """Días a ingerir: desde --desde (o hoy en cada tenant) durante --dias días locales"""
+    return fechas_por_zonas({t.timezone for t in tenants.values()}, args.dias, args.desde)
+
+
+def cmd_build(args, store: IndexStore, force: bool = True) -> int:
+    generator = _generator(args.device)
+    while True:
+        try:
+            tenants = cargar_tenants()
+            build_index(generator, store, force=force, keep=args.keep, fechas=_fechas(args, tenants),
+                        ligas=ligas_indexadas(tenants), shard_by=args.shard_by, num_shards=args.shards)
+        except IndexLockedError as e:
+            print(f"[INFO] {e}")
+        except Exception as e:
+            print(f"[ERROR] Falló la construcción del índice: {e}")
+            if not args.interval:
+                return 1
+        if not args.interval:
+            return 0
+        time.sleep(args.interval)
+
+
+def cmd_refresh(args, store: IndexStore) -> int:
+    return cmd_build(args, store, force=False)
+
+
+def cmd_verify(args, store: IndexStore) -> int:
+    metadata = store.read_metadata()
+    path = store.current_path()
+    if not path:
+        print("[ERROR] No hay ninguna versión publicada")
+        return 1
+
+    try:
+        vector_store = _generator(args.device).load_saved_index(path)
+    except Exception as e:
+        print(f"[ERROR] No se pudo cargar {path}: {e}")
+        return 1
+
+    ntotal = vector_store.index.ntotal
+    if ntotal != metadata.get("documents"):
+        print(f"[ERROR] Documentos en índice ({ntotal}) != metadata ({metadata.get('documents')})")
+        return 1
+
+    resultados = vector_store.similarity_search(args.query, k=1) if ntotal else []
+    print(f"[INFO] Versión {metadata['current']} OK | Documentos: {ntotal} | Resultados de prueba: {len(resultados)}")
+    return 0
+
+
+def cmd_stats(args, store: IndexStore) -> int:
+    def tamano(path):
+        return sum(
+            os.path.getsize(os.path.join(root, f))
+            for root, _, files in os.walk(path) for f in files
+        )
+
+    stats = {
+        "metadata": store.read_metadata(),
+        "versions": {v: tamano(store.version_path(v)) for v in store.versions()},
+        "locked": store.lock().locked()
+    }
+    print(json.dumps(stats, indent=2, ensure_ascii=False))
+    return 0
+
+
+def cmd_live(args, store: IndexStore) -> int:
+    """Sondea los partidos en vivo y publica vector_store/live.json para todos los procesos"""
+    from app.live import LiveFixtureStore, LivePoller
+    os.makedirs(store.base_dir, exist_ok=True)
+    poller = LivePoller(LiveFixtureStore(store.live_path), interval=args.interval)
+    while True:
+        try:
+            poller.poll_once()
+        except Exception as e:
+            print(f"[ERROR] Sondeo de partidos en vivo: {e}")
+        time.sleep(args.interval)
+
+
+def cmd_serve_shard(args, store: IndexStore) -> int:
+    from app.shards import ShardServer
+    ShardServer(store, args.shard, reload_interval=args.reload_interval).serve(args.host, args.port)
+    return 0
+
+
+def cmd_serve_shards(args, store: IndexStore) -> int:
+    """
+    Despliegue local: un proceso por shard de la versión vigente, en puertos consecutivos.
+    La cantidad de shards es fija, así que las versiones siguientes usan los mismos procesos.
+    """
+    from app.shards import leer_manifest
+    path = store.current_path()
+    shards = sorted(leer_manifest(path).get("shards", {})) if path else []
+    if not shards:
+        print("[ERROR] La versión vigente no tiene shards (construir con --shard-by)")
+        return 1
+
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    procesos, urls = [], []
+    for i, shard in enumerate(shards):
+        port = args.port_base + i
+        procesos.append(subprocess.Popen([
+            sys.executable, "-m", "app.run_embeddings", "--store", os.path.abspath(store.base_dir),
+            "serve-shard", "--shard", shard, "--host", args.host, "--port", str(port),
+            "--reload-interval", str(args.reload_interval)
+        ], cwd=raiz))
+        urls.append(f"http://{args.host}:{port}")
+    print(f"[INFO] {len(shards)} shards en marcha. Para el API: RAG_SHARD_URLS={','.join(urls)}")
+
+    # docker/systemd detienen con SIGTERM: que también baje los shards
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        for proceso in procesos:
+            proceso.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for proceso in procesos:
+            proceso.terminate()
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Construcción offline de índices FAISS")
+    parser.add_argument("--store", default=None, help="Directorio base (por defecto vector_store/)")
+    parser.add_argument("--device", default="cpu", help="Dispositivo del modelo de embeddings")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    for nombre, ayuda in [("build", "Construye y publica una versión nueva"),
+                          ("refresh", "Construye solo si la versión vigente no cubre el día de cada tenant")]:
+        sub = subparsers.add_parser(nombre, help=ayuda)
+        sub.add_argument("--keep", type=int, default=3, help="Versiones viejas a conservar")
+        sub.add_argument("--interval", type=int, default=0, help="Repetir cada N segundos (0 = una vez)")
+        sub.add_argument("--dias", type=int, default=1, help="Cantidad de días locales a ingerir (backfill)")
+        sub.add_argument("--desde", default=None, help="Primer día a ingerir (YYYY-MM-DD, por defecto hoy)")
+        sub.add_argument("--shard-by", choices=["league", "season"], default=None,
+                         help="Repartir además el índice en shards por liga o temporada")
+        sub.add_argument("--shards", type=int, default=8,
+                         help="Cantidad fija de shards (cambiarla obliga a relanzar serve-shards)")
+
+    verify = subparsers.add_parser("verify", help="Verifica la versión vigente")
+    verify.add_argument("--query", default="partidos de hoy", help="Consulta de prueba")
+
+    subparsers.add_parser("stats", help="Muestra versiones y metadata")
+
+    live = subparsers.add_parser("live", help="Sondea marcadores en vivo (un solo proceso por despliegue)")
+    live.add_argument("--interval", type=int, default=30, help="Segundos entre sondeos")
+
+    serve_shard = subparsers.add_parser("serve-shard", help="Sirve un shard por HTTP")
+    serve_shard.add_argument("--shard", required=True, help="Nombre del shard (ver stats)")
+    serve_shard.add_argument("--port", type=int, default=8101)
+
+    serve_shards = subparsers.add_parser("serve-shards", help="Lanza un proceso por shard")
+    serve_shards.add_argument("--port-base", type=int, default=8101, help="Puerto del primer shard")
+
+    for sub in (serve_shard, serve_shards):
+        sub.add_argument("--host", default="127.0.0.1")
+        sub.add_argument("--reload-interval", type=int, default=60,
+                         help="Segundos entre chequeos de versión nueva")
+
+    args = parser.parse_args(argv)
+    store = IndexStore(args.store)
+    comandos = {
+        "build": cmd_build,
+        "refresh": cmd_refresh,
+        "verify": cmd_verify,
+        "stats": cmd_stats,
+        "live": cmd_live,
+        "serve-shard": cmd_serve_shard,
+        "serve-shards": cmd_serve_shards,
+    }
+    return comandos[args.command](args, store)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
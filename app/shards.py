@@ -0,0 +1,336 @@
+import os
+import re
+import json
+import time
+import zlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import requests
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_community.vectorstores import FAISS
+from langchain.schema import Document
+from app.indexing import IndexStore
+
+SHARDS_DIR = "shards"
+MANIFEST = "shards.json"
+CRITERIOS = ("league", "season")
+NUM_SHARDS = 8
+
+
+class ShardsUnavailableError(RuntimeError):
+    """Ningún shard respondió: no hay resultados que dar (ni que cachear)"""
+
+
+def _slug(texto: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", texto.lower()).strip("-") or "general"
+
+
+def nombres_shards(por: str, num_shards: int = NUM_SHARDS) -> List[str]:
+    return [f"{por}-{n:02d}" for n in range(num_shards)]
+
+
+def clave_shard(metadata: dict, por: str = "league", num_shards: int = NUM_SHARDS) -> str:
+    """
+    Shard al que pertenece un documento. La cantidad de shards es fija: las ligas se
+    reparten por hash (crc32, estable entre procesos) y las temporadas por año módulo N,
+    así los procesos que sirven los shards no cambian cuando entran o salen ligas.
+    """
+    if por == "season":
+        fecha = metadata.get("match_date") or ""
+        n = int(fecha[:4]) if fecha[:4].isdigit() else 0
+    elif "league" in metadata:
+        n = zlib.crc32(_slug(f"{metadata.get('country') or 'int'}-{metadata['league']}").encode("utf-8"))
+    else:
+        n = 0
+    return nombres_shards(por, num_shards)[n % num_shards]
+
+
+class _SinModelo(Embeddings):
+    """Los shards buscan por vector: el modelo de embeddings vive solo en el motor"""
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        raise RuntimeError("Los shards no codifican texto")
+
+    def embed_query(self, text: str) -> List[float]:
+        raise RuntimeError("Los shards no codifican texto")
+
+
+def particionar_indice(vector_store: FAISS, destino: str, por: str = "league",
+                       num_shards: int = NUM_SHARDS) -> Dict[str, int]:
+    """
+    Reparte un índice ya construido en `num_shards` sub-índices (destino/<shard>/)
+    reutilizando los vectores existentes, sin volver a codificar. Devuelve documentos
+    por shard; los shards vacíos figuran con 0 (y no tienen archivos).
+    """
+    if por not in CRITERIOS:
+        raise ValueError(f"Criterio de partición desconocido: {por}")
+
+    grupos: Dict[str, Tuple[List[Tuple[str, np.ndarray]], List[dict]]] = {}
+    ntotal = vector_store.index.ntotal
+    vectores = vector_store.index.reconstruct_n(0, ntotal) if ntotal else []
+    for i in range(ntotal):
+        doc = vector_store.docstore.search(vector_store.index_to_docstore_id[i])
+        pares, metadatas = grupos.setdefault(clave_shard(doc.metadata, por, num_shards), ([], []))
+        pares.append((doc.page_content, vectores[i]))
+        metadatas.append(doc.metadata)
+
+    os.makedirs(destino, exist_ok=True)
+    manifest = {nombre: 0 for nombre in nombres_shards(por, num_shards)}
+    for nombre, (pares, metadatas) in grupos.items():
+        shard = FAISS.from_embeddings(pares, _SinModelo(), metadatas=metadatas)
+        shard.save_local(folder_path=os.path.join(destino, nombre), index_name="index")
+        manifest[nombre] = len(pares)
+
+    with open(os.path.join(destino, MANIFEST), 'w') as f:
+        json.dump({"por": por, "num_shards": num_shards, "shards": manifest}, f)
+    print(f"[PERF] Índice repartido por {por} en {len(manifest)} shards ({len(grupos)} con documentos)")
+    return manifest
+
+
+def leer_manifest(version_path: str) -> dict:
+    try:
+        with open(os.path.join(version_path, SHARDS_DIR, MANIFEST), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def filtro_metadata(ligas: Optional[set] = None, fechas: Optional[set] = None) -> Optional[Callable[[dict], bool]]:
+    """Filtro de documentos por ligas (league, country) y días (match_date); None si no filtra nada"""
+    if ligas is None and fechas is None:
+        return None
+
+    def admite(metadata: dict) -> bool:
+        if fechas is not None and "match_date" in metadata and metadata["match_date"] not in fechas:
+            return False
+        return ligas is None or "league" not in metadata \
+            or (metadata["league"], metadata.get("country")) in ligas
+
+    return admite
+
+
+def buscar_por_vectores(vector_store: FAISS, vectors: np.ndarray, k: int,
+                        filtro: Optional[Callable[[dict], bool]] = None) -> List[List[Tuple[Document, float]]]:
+    """Búsqueda por lotes sobre un índice FAISS, con filtro opcional sobre la metadata"""
+    if not vector_store.index.ntotal:
+        return [[] for _ in vectors]
+    fetch_k = min(max(20, k * 10), vector_store.index.ntotal) if filtro is not None else k
+    distancias, indices = vector_store.index.search(vectors, fetch_k)
+
+    resultados = []
+    for fila_d, fila_i in zip(distancias, indices):
+        docs = []
+        for distancia, i in zip(fila_d, fila_i):
+            if i == -1:
+                continue
+            doc = vector_store.docstore.search(vector_store.index_to_docstore_id[int(i)])
+            if filtro is not None and not filtro(doc.metadata):
+                continue
+            docs.append((doc, float(distancia)))
+            if len(docs) == k:
+                break
+        resultados.append(docs)
+    return resultados
+
+
+class ShardServer:
+    """
+    Proceso que sirve un shard de la versión vigente por HTTP:
+      POST /search  {"vectors": [[...]], "k": 3, "ligas": [[liga, país], ...] | null, "fechas": [...] | null}
+      GET  /health
+    Recarga el shard cuando el worker de indexación publica una versión nueva. Un shard
+    vacío responde sin resultados; uno que la versión vigente no define responde 503
+    (el cliente lo cuenta como caído en vez de dar por buena una respuesta vacía).
+    """
+
+    def __init__(self, store: IndexStore, shard: str, reload_interval: int = 60):
+        self.store = store
+        self.shard = shard
+        self.reload_interval = reload_interval
+        self.version = None
+        self.vector_store: Optional[FAISS] = None
+        self.disponible = False
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        with self._lock:
+            self._last_check = time.time()
+            version = self.store.current_version()
+            if not version or version == self.version:
+                return
+            version_path = self.store.version_path(version)
+            if self.shard not in leer_manifest(version_path).get("shards", {}):
+                # Otra partición (criterio o cantidad de shards): hay que relanzar los procesos
+                print(f"[ERROR] Shard {self.shard} no existe en la versión {version}")
+                self.vector_store, self.version, self.disponible = None, version, False
+                return
+            path = os.path.join(version_path, SHARDS_DIR, self.shard)
+            if not os.path.exists(os.path.join(path, "index.faiss")):
+                print(f"[INFO] Shard {self.shard} vacío en la versión {version}")
+                self.vector_store, self.version, self.disponible = None, version, True
+                return
+            self.vector_store = FAISS.load_local(
+                folder_path=path,
+                embeddings=_SinModelo(),
+                allow_dangerous_deserialization=True,  # índices propios, generados por el worker
+                index_name="index"
+            )
+            self.version, self.disponible = version, True
+            print(f"[PERF] Shard {self.shard} ({version}) cargado | Documentos: {self.vector_store.index.ntotal}")
+
+    def search(self, vectors: Sequence[Sequence[float]], k: int, ligas=None, fechas=None) -> List[list]:
+        if time.time() - self._last_check >= self.reload_interval:
+            self.load()
+        if not self.disponible:
+            raise ShardsUnavailableError(f"Shard {self.shard} no disponible en la versión {self.version}")
+        vector_store = self.vector_store
+        if vector_store is None:
+            return [[] for _ in vectors]
+        filtro = filtro_metadata({tuple(liga) for liga in ligas} if ligas is not None else None,
+                                 set(fechas) if fechas is not None else None)
+        resultados = buscar_por_vectores(vector_store, np.asarray(vectors, dtype=np.float32), k, filtro)
+        return [
+            [{"page_content": doc.page_content, "metadata": doc.metadata, "score": score} for doc, score in fila]
+            for fila in resultados
+        ]
+
+    def health(self) -> dict:
+        vector_store = self.vector_store
+        return {
+            "shard": self.shard,
+            "version": self.version,
+            "available": self.disponible,
+            "documents": vector_store.index.ntotal if vector_store else 0
+        }
+
+    def serve(self, host: str = "127.0.0.1", port: int = 8101):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _json(self, status: int, body: dict):
+                data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path == "/health":
+                    self._json(200, server.health())
+                else:
+                    self._json(404, {"error": "no encontrado"})
+
+            def do_POST(self):
+                if self.path != "/search":
+                    self._json(404, {"error": "no encontrado"})
+                    return
+                try:
+                    body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                    start = time.time()
+                    results = server.search(body["vectors"], int(body.get("k", 3)), body.get("ligas"),
+                                            body.get("fechas"))
+                    self._json(200, {"results": results, "version": server.version,
+                                     "elapsed_ms": round((time.time() - start) * 1000, 2)})
+                except ShardsUnavailableError as e:
+                    self._json(503, {"error": str(e)})
+                except (KeyError, ValueError) as e:
+                    self._json(400, {"error": str(e)})
+
+            def log_message(self, *args):
+                pass  # sin log por request
+
+        httpd = ThreadingHTTPServer((host, port), Handler)
+        print(f"[INFO] Shard {self.shard} escuchando en http://{host}:{port}")
+        try:
+            httpd.serve_forever()
+        finally:
+            httpd.server_close()
+
+
+class ShardStats:
+    """Latencia por shard vista desde el motor (incluye red y serialización)"""
+
+    def __init__(self):
+        self._data: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, url: str, ms: float, error: bool = False):
+        with self._lock:
+            stats = self._data.setdefault(url, {"requests": 0, "errors": 0, "total_ms": 0.0,
+                                                "max_ms": 0.0, "last_ms": 0.0})
+            stats["requests"] += 1
+            stats["errors"] += int(error)
+            stats["total_ms"] += ms
+            stats["max_ms"] = max(stats["max_ms"], ms)
+            stats["last_ms"] = ms
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            return {
+                url: {
+                    "requests": s["requests"],
+                    "errors": s["errors"],
+                    "avg_ms": round(s["total_ms"] / s["requests"], 2) if s["requests"] else 0.0,
+                    "max_ms": round(s["max_ms"], 2),
+                    "last_ms": round(s["last_ms"], 2),
+                }
+                for url, s in self._data.items()
+            }
+
+
+class ShardedVectorStore:
+    """
+    Cliente de los shards: envía los vectores de consulta a todos en paralelo y combina
+    el top-k global por distancia L2. Un shard caído o lento no tumba la consulta:
+    se responde con los demás y el resultado se marca incompleto; si no responde
+    ninguno se lanza ShardsUnavailableError.
+    """
+
+    def __init__(self, urls: Sequence[str], timeout: float = 2.0):
+        self.urls = [url.rstrip("/") for url in urls]
+        self.timeout = timeout
+        self.stats = ShardStats()
+        self._session = requests.Session()
+        self._executor = ThreadPoolExecutor(max_workers=max(len(self.urls), 1))
+
+    def _consultar(self, url: str, body: dict) -> Optional[List[list]]:
+        start = time.time()
+        try:
+            response = self._session.post(f"{url}/search", json=body, timeout=self.timeout)
+            response.raise_for_status()
+            results = response.json()["results"]
+            self.stats.registrar(url, (time.time() - start) * 1000)
+            return results
+        except Exception as e:
+            self.stats.registrar(url, (time.time() - start) * 1000, error=True)
+            print(f"[ERROR] Shard {url}: {e}")
+            return None
+
+    def search(self, vectors: np.ndarray, k: int, ligas: Optional[set] = None,
+               fechas: Optional[set] = None) -> Tuple[List[List[Document]], bool]:
+        """Top-k por consulta y si respondieron todos los shards"""
+        body = {
+            "vectors": np.asarray(vectors, dtype=np.float32).tolist(),
+            "k": k,
+            "ligas": sorted(ligas, key=str) if ligas is not None else None,
+            "fechas": sorted(fechas) if fechas is not None else None
+        }
+        respuestas = list(self._executor.map(lambda url: self._consultar(url, body), self.urls))
+        if all(r is None for r in respuestas):
+            raise ShardsUnavailableError(f"Ninguno de los {len(self.urls)} shards respondió")
+
+        resultados = []
+        for i in range(len(body["vectors"])):
+            candidatos = [item for r in respuestas if r is not None for item in r[i]]
+            candidatos.sort(key=lambda item: item["score"])
+            resultados.append([
+                Document(page_content=item["page_content"], metadata=item["metadata"])
+                for item in candidatos[:k]
+            ])
+        return resultados, None not in respuestas
@@ -0,0 +1,98 @@
+import re
+import json
+import codecs
+from typing import Any, Iterable, Iterator, Optional
+
+_NO_ESPACIO = re.compile(r"\S")
+_decoder = json.JSONDecoder()
+
+
+class _Buffer:
+    """Texto decodificado de a pedazos; solo conserva lo que todavía no se consumió"""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.texto = ""
+        self.pos = 0
+        self.fin = False
+
+    def cargar(self) -> bool:
+        """Agrega el siguiente pedazo; False si ya no hay más datos"""
+        if self.fin:
+            return False
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            self.fin = True
+            nuevo = self._utf8.decode(b"", final=True)
+        else:
+            nuevo = self._utf8.decode(chunk)
+        self.texto = self.texto[self.pos:] + nuevo
+        self.pos = 0
+        return True
+
+    def siguiente(self) -> Optional[str]:
+        """Próximo carácter no blanco (sin consumirlo); None al final"""
+        while True:
+            m = _NO_ESPACIO.search(self.texto, self.pos)
+            if m:
+                self.pos = m.start()
+                return self.texto[self.pos]
+            self.pos = len(self.texto)
+            if not self.cargar():
+                return None
+
+    def consumir(self, *esperados: str) -> str:
+        c = self.siguiente()
+        if c not in esperados:
+            raise ValueError(f"JSON inválido: se esperaba {esperados} y llegó {c!r}")
+        self.pos += 1
+        return c
+
+    def valor(self) -> Any:
+        """Decodifica el próximo valor JSON completo, leyendo más datos si hace falta"""
+        while True:
+            self.siguiente()
+            try:
+                valor, fin = _decoder.raw_decode(self.texto, self.pos)
+            except json.JSONDecodeError:
+                if not self.cargar():
+                    raise
+                continue
+            if fin == len(self.texto) and self.cargar():
+                # Un número al final del buffer podría estar cortado
+                continue
+            self.pos = fin
+            return valor
+
+
+def iterar_array_json(chunks: Iterable[bytes], clave: str, otros: Optional[dict] = None) -> Iterator[Any]:
+    """
+    Recorre un objeto JSON que llega en pedazos y devuelve uno a uno los elementos
+    del array `clave`, sin cargar el documento completo en memoria.
+    Los demás campos del nivel superior se guardan en `otros` (si se pasa).
+    """
+    buffer = _Buffer(chunks)
+    buffer.consumir("{")
+    if buffer.siguiente() == "}":
+        return
+
+    while True:
+        nombre = buffer.valor()
+        buffer.consumir(":")
+        if nombre == clave and buffer.siguiente() == "[":
+            buffer.consumir("[")
+            if buffer.siguiente() == "]":
+                buffer.consumir("]")
+            else:
+                while True:
+                    yield buffer.valor()
+                    if buffer.consumir(",", "]") == "]":
+                        break
+        else:
+            valor = buffer.valor()
+            if otros is not None:
+                otros[nombre] = valor
+
+        if buffer.consumir(",", "}") == "}":
+            return
@@ -0,0 +1,70 @@
+import os
+import json
+from datetime import date, datetime
+from functools import cached_property
+from typing import Dict, List, Optional, Set, Tuple
+from pydantic import BaseModel
+from app.fixtures import zona_horaria
+from app.ingestion import fechas_por_zonas, ligas_relevantes, TZ_ARG
+
+DEFAULT_TENANT = "ar"
+DEFAULT_TENANTS_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "tenants.json"
+)
+
+
+class TenantConfig(BaseModel):
+    """Configuración por región/idioma sobre el modelo y el índice compartidos"""
+    nombre: str
+    timezone: str = TZ_ARG
+    etiqueta_hora: str = "ARG"
+    idioma: str = "es"
+    ligas: Optional[List[Tuple[str, Optional[str]]]] = None  # None = todas las del índice
+    plantilla: Optional[str] = None  # por defecto, la del idioma
+
+    @cached_property
+    def ligas_set(self) -> Optional[Set[Tuple[str, Optional[str]]]]:
+        return set(self.ligas) if self.ligas is not None else None
+
+    def hoy(self) -> date:
+        """Día local del tenant: el "hoy" del contexto que recibe el LLM"""
+        return datetime.now(zona_horaria(self.timezone)).date()
+
+    def fechas_indice(self, dia: Optional[date] = None) -> Set[str]:
+        """match_date del índice (días ARG) que se solapan con el día local `dia` (por defecto hoy)"""
+        return set(fechas_por_zonas([self.timezone], desde=(dia or self.hoy()).isoformat()))
+
+    def admite(self, metadata: dict, fechas: Optional[Set[str]] = None) -> bool:
+        """Filtro de metadata: el documento pertenece a una liga del tenant (y, con `fechas`, a esos días)"""
+        if fechas is not None and "match_date" in metadata and metadata["match_date"] not in fechas:
+            return False
+        if self.ligas is None or "league" not in metadata:
+            return True
+        return (metadata["league"], metadata.get("country")) in self.ligas_set
+
+
+def cargar_tenants(path: Optional[str] = None) -> Dict[str, TenantConfig]:
+    """
+    Lee los tenants de un JSON ({"ar": {...}, "es": {...}}); ruta por defecto tenants.json
+    o RAG_TENANTS_FILE. Sin archivo, solo existe el tenant argentino por defecto.
+    """
+    path = path or os.getenv("RAG_TENANTS_FILE", DEFAULT_TENANTS_FILE)
+    tenants = {DEFAULT_TENANT: TenantConfig(nombre=DEFAULT_TENANT)}
+    if not os.path.exists(path):
+        return tenants
+
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    for nombre, config in data.items():
+        tenants[nombre] = TenantConfig(nombre=nombre, **config)
+    return tenants
+
+
+def ligas_indexadas(tenants: Dict[str, TenantConfig]) -> Set[Tuple[str, Optional[str]]]:
+    """Unión de las ligas de todos los tenants: lo que debe contener el índice compartido"""
+    ligas = set(ligas_relevantes)
+    for tenant in tenants.values():
+        if tenant.ligas is not None:
+            ligas |= tenant.ligas_set
+    return ligas
@@ -0,0 +1,175 @@
+import os
+import json
+import hashlib
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+class VectorCache:
+    """
+    Caché persistente de embeddings: hash(modelo + texto) -> vector float32.
+    Los vectores viven en un archivo memory-mapped (vectors.f32) y el índice de slots
+    en index.json; al llenarse se reemplazan los menos usados (LRU).
+    Cada slot lleva además la clave que contiene (keys.bin): si index.json quedó viejo
+    (build cortado tras reciclar slots) la lectura lo detecta y cuenta un miss.
+    """
+
+    FORMATO = 2
+
+    def __init__(self, directory: str, model_id: str, capacity: int = 20000):
+        self.directory = directory
+        self.model_id = model_id
+        self.capacity = capacity
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.index_path = os.path.join(directory, "index.json")
+        self.keys_path = os.path.join(directory, "keys.bin")
+        self.dim: Optional[int] = None
+        self._slots: Dict[str, List[int]] = {}  # clave -> [slot, último uso]
+        self._clock = 0
+        self._vectors: Optional[np.memmap] = None
+        self._stamps: Optional[np.memmap] = None  # clave (16 bytes) guardada en cada slot
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.index_path, 'r') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return
+        if meta.get("model_id") != self.model_id or meta.get("capacity") != self.capacity \
+                or meta.get("format") != self.FORMATO \
+                or not os.path.exists(self.vectors_path) or not os.path.exists(self.keys_path):
+            print(f"[INFO] Caché de embeddings incompatible, se descarta: {self.directory}")
+            return
+        self.dim = meta["dim"]
+        self._slots = meta["slots"]
+        self._clock = meta.get("clock", 0)
+        self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r+",
+                                  shape=(self.capacity, self.dim))
+        self._stamps = np.memmap(self.keys_path, dtype=np.uint8, mode="r+", shape=(self.capacity, 16))
+
+    def _open(self, dim: int):
+        """Crea el archivo de vectores la primera vez que se conoce la dimensión"""
+        os.makedirs(self.directory, exist_ok=True)
+        self.dim = dim
+        self._slots = {}
+        self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="w+",
+                                  shape=(self.capacity, dim))
+        self._stamps = np.memmap(self.keys_path, dtype=np.uint8, mode="w+", shape=(self.capacity, 16))
+
+    def key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_id}\0{text}".encode("utf-8")).hexdigest()[:32]
+
+    def get_many(self, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        resultado = []
+        for text in texts:
+            clave = self.key(text)
+            entrada = self._slots.get(clave) if self._vectors is not None else None
+            if entrada is not None and self._stamps[entrada[0]].tobytes() != bytes.fromhex(clave):
+                # El slot ya guarda otro vector: el índice no está al día
+                del self._slots[clave]
+                entrada = None
+            if entrada is None:
+                self.misses += 1
+                resultado.append(None)
+                continue
+            self._clock += 1
+            entrada[1] = self._clock
+            self.hits += 1
+            resultado.append(np.array(self._vectors[entrada[0]]))
+        return resultado
+
+    def _free_slots(self, n: int) -> List[int]:
+        """
+        Slots libres; si no alcanzan, libera los `n` menos usados. Las claves desalojadas
+        se quitan de index.json en disco antes de que sus slots se sobrescriban.
+        """
+        usados = {slot for slot, _ in self._slots.values()}
+        libres = [s for s in range(self.capacity) if s not in usados][:n]
+        if len(libres) < n:
+            viejos = sorted(self._slots.items(), key=lambda item: item[1][1])[:n - len(libres)]
+            for clave, (slot, _) in viejos:
+                del self._slots[clave]
+                libres.append(slot)
+            self._write_index()
+        return libres
+
+    def put_many(self, texts: Sequence[str], vectors: Sequence[Sequence[float]]):
+        if not texts:
+            return
+        matriz = np.asarray(vectors, dtype=np.float32)
+        if self._vectors is None or self.dim != matriz.shape[1]:
+            self._open(matriz.shape[1])
+
+        # Solo textos nuevos (y sin repetir); como mucho `capacity`
+        nuevos = {}
+        for text, vector in zip(texts, matriz):
+            clave = self.key(text)
+            if clave not in self._slots:
+                nuevos[clave] = vector
+        items = list(nuevos.items())[-self.capacity:]
+
+        for (clave, vector), slot in zip(items, self._free_slots(len(items))):
+            self._clock += 1
+            self._stamps[slot] = 0  # slot inválido mientras se escribe el vector
+            self._vectors[slot] = vector
+            self._stamps[slot] = np.frombuffer(bytes.fromhex(clave), dtype=np.uint8)
+            self._slots[clave] = [slot, self._clock]
+
+    def _write_index(self):
+        """Escritura atómica y durable de index.json"""
+        meta = {
+            "format": self.FORMATO,
+            "model_id": self.model_id,
+            "dim": self.dim,
+            "capacity": self.capacity,
+            "clock": self._clock,
+            "slots": self._slots
+        }
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.index_path)
+
+    def save(self):
+        """Persiste vectores e índice (el índice al final: solo apunta a slots ya escritos)"""
+        if self._vectors is None:
+            return
+        self._vectors.flush()
+        self._stamps.flush()
+        self._write_index()
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+
+class CachedEmbeddings(Embeddings):
+    """Envuelve un modelo de embeddings y consulta la caché antes de codificar"""
+
+    def __init__(self, base: Embeddings, cache: VectorCache):
+        self.base = base
+        self.cache = cache
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectores = self.cache.get_many(texts)
+        # Textos faltantes sin repetir -> posiciones donde van
+        faltantes: Dict[str, List[int]] = {}
+        for i, v in enumerate(vectores):
+            if v is None:
+                faltantes.setdefault(texts[i], []).append(i)
+        if faltantes:
+            textos = list(faltantes)
+            nuevos = self.base.embed_documents(textos)
+            self.cache.put_many(textos, nuevos)
+            for text, vector in zip(textos, nuevos):
+                for i in faltantes[text]:
+                    vectores[i] = vector
+        return [list(map(float, v)) for v in vectores]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.base.embed_query(text)
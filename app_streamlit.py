@@ -1,8 +1,8 @@
 import streamlit as st
-from app.rag_engine import RAGEngine
+from app.rag_engine import RAGEngine, RAGConfig
 
-# Instancia del motor RAG
-engine = RAGEngine(embedding_device='cpu')
+# Instancia del motor RAG (despliegue standalone: construye el índice si hace falta, bajo lock)
+engine = RAGEngine(RAGConfig(auto_regenerate=True), embedding_device='cpu')
 
 # Configuración de página
 st.set_page_config(page_title="Fútbol RAG - Consulta", layout="wide")
@@ -0,0 +1,121 @@
+import os
+import re
+import json
+import hashlib
+from datetime import date, datetime
+
+import numpy as np
+import pytest
+import pytz
+from langchain_core.embeddings import Embeddings
+
+from app.fixtures import Fixture, FixtureTable
+from app.indexing import IndexStore
+
+TZ_ARG = "America/Argentina/Buenos_Aires"
+DIA = date(2025, 10, 9)  # "hoy" de los tests con partidos de fecha fija
+
+
+class EmbeddingsFalsos(Embeddings):
+    """Bolsa de palabras con hash: determinística, sin modelo; registra lo que codifica"""
+
+    dim = 64
+
+    def __init__(self):
+        self.textos = []
+
+    def _vector(self, texto: str):
+        v = np.zeros(self.dim, dtype=np.float32)
+        for palabra in re.findall(r"\w+", texto.lower()):
+            v[int(hashlib.md5(palabra.encode("utf-8")).hexdigest(), 16) % self.dim] += 1.0
+        return (v / (np.linalg.norm(v) or 1.0)).tolist()
+
+    def embed_documents(self, texts):
+        self.textos.extend(texts)
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text):
+        self.textos.append(text)
+        return self._vector(text)
+
+
+class GeneradorFalso:
+    """Reemplazo de EmbeddingGenerator para el motor (sin torch ni descarga del modelo)"""
+
+    def __init__(self, embedding_type="huggingface", device="cpu"):
+        self.embeddings = EmbeddingsFalsos()
+
+    def get_embedding_model(self):
+        return self.embeddings
+
+    def load_saved_index(self, path):
+        from langchain_community.vectorstores import FAISS
+        return FAISS.load_local(folder_path=path, embeddings=self.embeddings,
+                                allow_dangerous_deserialization=True, index_name="index")
+
+
+def partido(fid: int, local: str, visitante: str, cuando: str, tz: str = TZ_ARG,
+            liga: str = "Premier League", pais: str = "England") -> Fixture:
+    """Partido con horario local 'YYYY-MM-DD HH:MM' en la zona `tz`"""
+    kickoff = pytz.timezone(tz).localize(datetime.strptime(cuando, "%Y-%m-%d %H:%M"))
+    return Fixture(fid, int(kickoff.timestamp()), local, visitante, liga, pais)
+
+
+def publicar(store: IndexStore, partidos, version: str = "v1"):
+    """Publica una versión del índice armada con los chunks reales de la ingesta"""
+    from langchain_community.vectorstores import FAISS
+    from app.ingestion import iterar_chunks
+
+    path = store.version_path(version)
+    docs = list(iterar_chunks(partidos))
+    FAISS.from_documents(docs, EmbeddingsFalsos()).save_local(folder_path=path, index_name="index")
+    tabla = FixtureTable()
+    tabla.extend(partidos)
+    tabla.save(os.path.join(path, "fixtures.json"))
+    store.publish(version, documents=len(docs))
+
+
+@pytest.fixture
+def dia_fijo(monkeypatch):
+    """Fija el día local de todos los tenants en DIA (la búsqueda se limita al día del tenant)"""
+    from app.tenants import TenantConfig
+    monkeypatch.setattr(TenantConfig, "hoy", lambda self: DIA)
+    return DIA
+
+
+@pytest.fixture
+def crear_motor(tmp_path, monkeypatch):
+    """
+    Fábrica de RAGEngine sobre un índice publicado en tmp_path, con embeddings falsos y
+    caché en memoria. El LLM se reemplaza en cada test (motor.generate_response).
+    """
+    pytest.importorskip("langchain_huggingface")  # app.embeddings lo importa al cargarse
+    import app.rag_engine as rag_engine
+    monkeypatch.setattr(rag_engine, "EmbeddingGenerator", GeneradorFalso)
+    creados = []
+
+    def crear(partidos, tenants: dict = None, **config):
+        store_dir = str(tmp_path / f"store{len(creados)}")
+        publicar(IndexStore(store_dir), partidos)
+        if tenants is not None:
+            config["tenants_file"] = str(tmp_path / f"tenants{len(creados)}.json")
+            with open(config["tenants_file"], 'w', encoding='utf-8') as f:
+                json.dump(tenants, f)
+        motor = rag_engine.RAGEngine(rag_engine.RAGConfig(store_dir=store_dir, cache_backend="memory", **config))
+        motor.load_index()
+        creados.append(motor)
+        return motor
+
+    yield crear
+    for motor in creados:
+        motor._llm_executor.shutdown(wait=True)
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch, crear_motor):
+    """app.main con el motor de prueba (devuelve el módulo; el motor se asigna con main.rag_engine)"""
+    import app.indexing as indexing
+    # El motor global de app.main no debe tocar vector_store/ del repo
+    monkeypatch.setattr(indexing, "DEFAULT_STORE_DIR", str(tmp_path / "default_store"))
+    import app.main as main
+    return main
@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+from conftest import partido
+
+pytestmark = pytest.mark.usefixtures("dia_fijo")
+
+PARTIDOS = [
+    partido(1, "Arsenal", "Chelsea", "2025-10-09 12:00"),
+    partido(2, "Liverpool", "Everton", "2025-10-09 14:00"),
+    partido(3, "Boca Juniors", "River Plate", "2025-10-09 21:00",
+            liga="Liga Profesional Argentina", pais="Argentina"),
+]
+
+
+def llm_contador(motor):
+    preguntas = []
+
+    def generate_response(context, question, tenant=None):
+        preguntas.append(question)
+        return f"respuesta a {question.strip().lower()}"
+
+    motor.generate_response = generate_response
+    return preguntas
+
+
+def test_query_many_dedupes_and_serves_cache_hits(crear_motor):
+    motor = crear_motor(PARTIDOS)
+    llamadas = llm_contador(motor)
+    embeddings = motor.embedding_generator.embeddings
+
+    preguntas = ["Arsenal", "  arsenal ", "River Plate", "ARSENAL"]
+    resultados = dict(motor.query_many(preguntas))
+    assert sorted(resultados) == [0, 1, 2, 3]
+    assert sorted(llamadas) == ["Arsenal", "River Plate"]  # una llamada por pregunta distinta
+    assert embeddings.textos.count("Arsenal") == 1 and len(embeddings.textos) == 2
+    for i in (0, 1, 3):
+        assert resultados[i]["answer"] == "respuesta a arsenal"
+    assert resultados[2]["answer"] == "respuesta a river plate"
+
+    resultados = dict(motor.query_many(["river plate", "Liverpool"]))
+    assert resultados[0]["cache_hit"] and resultados[0]["answer"] == "respuesta a river plate"
+    assert not resultados[1]["cache_hit"]
+    assert sorted(llamadas) == ["Arsenal", "Liverpool", "River Plate"]
+
+
+def test_ask_batch_streams_ndjson_with_original_positions(crear_motor, api, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    motor = crear_motor(PARTIDOS)
+    llamadas = llm_contador(motor)
+    monkeypatch.setattr(api, "rag_engine", motor)
+
+    preguntas = ["Liverpool", "Boca Juniors", "liverpool"]
+    response = TestClient(api.app).post("/ask/batch", json={"questions": preguntas})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lineas = [json.loads(linea) for linea in response.text.splitlines()]
+    assert sorted(linea["index"] for linea in lineas) == [0, 1, 2]
+    for linea in lineas:
+        assert linea["answer"] == f"respuesta a {preguntas[linea['index']].lower()}"
+        assert linea["docs_used"]
+    assert len(llamadas) == 2
+
+    assert TestClient(api.app).post("/ask/batch", json={"questions": []}).status_code == 422
@@ -0,0 +1,80 @@
+import time
+import multiprocessing
+
+import pytest
+
+from app.cache import CacheBackend, MemoryCacheBackend, SQLiteCacheBackend, build_cache_backend
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    return build_cache_backend(request.param, max_size=3, ttl=None,
+                               path=str(tmp_path / "cache.sqlite"), shared_max_size=3)
+
+
+def test_cache_backend_is_abstract():
+    with pytest.raises(TypeError):
+        CacheBackend()
+
+
+def test_roundtrip_and_normalized_keys(backend):
+    backend.set("¿Quién juega HOY?", {"answer": "Boca", "docs_used": []})
+    assert backend.get("  ¿quién juega hoy?  ") == {"answer": "Boca", "docs_used": []}
+    assert "¿quién juega hoy?" in backend
+    assert backend.get("otra") is None
+
+
+def test_keys_scoped_by_version(backend):
+    backend.set_version("v1")
+    backend.set("partidos", {"answer": "viejo"})
+    backend.set_version("v2")
+    assert backend.get("partidos") is None
+    backend.set_version("v1")
+    assert backend.get("partidos") == {"answer": "viejo"}
+
+
+def test_ttl_per_entry(backend):
+    backend.set("corta", {"answer": "x"}, ttl=0.05)
+    backend.set("larga", {"answer": "y"})
+    time.sleep(0.1)
+    assert backend.get("corta") is None
+    assert backend.get("larga") == {"answer": "y"}
+
+
+def test_lru_eviction(backend):
+    for q in ("a", "b", "c"):
+        backend.set(q, {"answer": q})
+        time.sleep(0.01)
+    assert backend.get("a") is not None  # "a" pasa a ser la más reciente
+    time.sleep(0.01)
+    backend.set("d", {"answer": "d"})
+    assert len(backend) == 3
+    assert backend.get("b") is None
+    assert backend.get("a") is not None
+
+
+def test_clear(backend):
+    backend.set("a", {"answer": "a"})
+    backend.clear()
+    assert len(backend) == 0
+
+
+def test_shared_tier_has_its_own_size(tmp_path):
+    cache = build_cache_backend("sqlite", max_size=2, path=str(tmp_path / "c.sqlite"), shared_max_size=50)
+    assert isinstance(cache, SQLiteCacheBackend)
+    assert cache.max_size == 50
+    assert isinstance(build_cache_backend("memory", max_size=2), MemoryCacheBackend)
+    with pytest.raises(ValueError):
+        build_cache_backend("redis", max_size=2)
+
+
+def _escribir(path):
+    SQLiteCacheBackend(path).set("compartida", {"answer": "desde otro proceso"})
+
+
+def test_sqlite_shared_between_processes(tmp_path):
+    path = str(tmp_path / "shared.sqlite")
+    proceso = multiprocessing.get_context("spawn").Process(target=_escribir, args=(path,))
+    proceso.start()
+    proceso.join(30)
+    assert SQLiteCacheBackend(path).get("compartida") == {"answer": "desde otro proceso"}
@@ -0,0 +1,90 @@
+import threading
+import time
+
+import pytest
+
+from conftest import partido
+
+pytestmark = pytest.mark.usefixtures("dia_fijo")
+
+PARTIDOS = [partido(1, "Arsenal", "Chelsea", "2025-10-09 12:00")]
+
+
+def llm_lento(motor, demora=0.3, error=None):
+    llamadas = []
+
+    def generate_response(context, question, tenant=None):
+        llamadas.append(question)
+        time.sleep(demora)
+        if error is not None:
+            raise error
+        return "respuesta del LLM"
+
+    motor.generate_response = generate_response
+    return llamadas
+
+
+def esperar_cache(motor, pregunta, timeout=5.0):
+    limite = time.time() + timeout
+    while time.time() < limite:
+        resultado = motor._query_cache.get(motor._cache_key(pregunta, motor.get_tenant()))
+        if resultado is not None:
+            return resultado
+        time.sleep(0.02)
+    return None
+
+
+def test_soft_deadline_returns_the_match_list_and_the_late_answer_fills_the_cache(crear_motor):
+    from app.prompts import mensaje
+
+    motor = crear_motor(PARTIDOS, llm_soft_deadline=0.05)
+    llamadas = llm_lento(motor)
+
+    degradado = motor.query("Arsenal")
+    assert degradado["degraded"] and not degradado["cache_hit"]
+    assert degradado["answer"].startswith(mensaje("es", "degradado"))
+    assert "Arsenal vs Chelsea" in degradado["answer"]
+
+    # Mientras el LLM sigue, la respuesta degradada no quedó en caché: se une a la llamada en curso
+    otra = motor.query("Arsenal")
+    assert otra["degraded"] and not otra["cache_hit"]
+
+    assert esperar_cache(motor, "Arsenal") is not None
+    tarde = motor.query("Arsenal")
+    assert tarde["cache_hit"] and not tarde.get("degraded")
+    assert tarde["answer"] == "respuesta del LLM"
+    assert llamadas == ["Arsenal"]
+
+
+def test_concurrent_askers_share_one_llm_call(crear_motor):
+    motor = crear_motor(PARTIDOS)
+    llamadas = llm_lento(motor)
+    barrera = threading.Barrier(5)
+    resultados = []
+
+    def preguntar():
+        barrera.wait()
+        resultados.append(motor.query("Arsenal"))
+
+    hilos = [threading.Thread(target=preguntar) for _ in range(5)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert len(llamadas) == 1
+    assert [r["answer"] for r in resultados] == ["respuesta del LLM"] * 5
+
+
+def test_llm_errors_are_degraded_and_never_cached(crear_motor):
+    from app.rag_engine import LLMError
+
+    motor = crear_motor(PARTIDOS)
+    llamadas = llm_lento(motor, demora=0, error=LLMError("proveedor caído"))
+
+    for _ in range(2):
+        resultado = motor.query("Arsenal")
+        assert resultado["degraded"] and not resultado["cache_hit"]
+        assert "Arsenal vs Chelsea" in resultado["answer"]
+    assert len(llamadas) == 2
+    assert esperar_cache(motor, "Arsenal", timeout=0.2) is None
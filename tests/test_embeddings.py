@@ -0,0 +1,41 @@
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.fixtures import Fixture
+
+
+class EmbeddingsRotos:
+    def embed_documents(self, texts):
+        raise RuntimeError("fallo del modelo")
+
+    def embed_query(self, text):
+        raise RuntimeError("fallo del modelo")
+
+
+def test_failed_build_stops_the_download(tmp_path, monkeypatch):
+    pytest.importorskip("langchain_huggingface")
+    import app.embeddings as embeddings
+    cerrada = threading.Event()
+
+    def descarga_infinita(fechas, ligas):
+        # Un partido por día: cada uno cierra un chunk, la cola se llena enseguida
+        inicio = datetime(2025, 10, 1, 18, 0, tzinfo=timezone.utc)
+        try:
+            dia = 0
+            while True:
+                kickoff = int((inicio + timedelta(days=dia)).timestamp())
+                yield Fixture(dia, kickoff, f"L{dia}", f"V{dia}", "Premier League", "England")
+                dia += 1
+        finally:
+            cerrada.set()
+
+    monkeypatch.setattr(embeddings, "iterar_partidos_fechas", descarga_infinita)
+    generador = embeddings.EmbeddingGenerator.__new__(embeddings.EmbeddingGenerator)
+    generador.embeddings = EmbeddingsRotos()
+
+    with pytest.raises(RuntimeError, match="fallo del modelo"):
+        generador.generate_embeddings_from_api(str(tmp_path / "indice"), buffer_size=2)
+    # El productor no queda bloqueado en la cola llena: suelta la descarga
+    assert cerrada.wait(5)
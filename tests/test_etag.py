@@ -0,0 +1,37 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from conftest import partido
+
+pytestmark = pytest.mark.usefixtures("dia_fijo")
+
+PARTIDOS = [partido(1, "Arsenal", "Chelsea", "2025-10-09 12:00")]
+
+
+def marcador(estado, local, visitante, minuto):
+    return {"fixture": {"id": 1, "status": {"short": estado, "elapsed": minuto}},
+            "goals": {"home": local, "away": visitante}}
+
+
+def test_etag_changes_when_the_match_ends(crear_motor, api, monkeypatch):
+    motor = crear_motor(PARTIDOS)
+    motor.generate_response = lambda context, question, tenant=None: context
+    monkeypatch.setattr(api, "rag_engine", motor)
+    client = TestClient(api.app)
+
+    previo = client.get("/ask", params={"question": "Arsenal"})
+    etag = previo.headers["etag"]
+    assert client.get("/ask", params={"question": "Arsenal"}, headers={"If-None-Match": etag}).status_code == 304
+
+    motor.live_store.update([marcador("2H", 1, 0, 60)])
+    en_juego = client.get("/ask", params={"question": "Arsenal"}, headers={"If-None-Match": etag})
+    assert en_juego.status_code == 200
+
+    # Ya nada en juego, pero el final sigue en la respuesta: no vale el ETag previo al partido
+    motor.live_store.update([marcador("FT", 2, 0, 90)])
+    assert not motor.live_store.in_play()
+    for viejo in (etag, en_juego.headers["etag"]):
+        final = client.get("/ask", params={"question": "Arsenal", "tenant": "ar"},
+                           headers={"If-None-Match": viejo})
+        assert final.status_code == 200
+    assert final.headers["etag"] not in (etag, en_juego.headers["etag"])
@@ -0,0 +1,36 @@
+from app.fixtures import Fixture, FixtureTable
+
+
+def crudo(fid, local="Boca Juniors", visitante="River Plate", liga="Liga Profesional Argentina",
+          pais="Argentina", timestamp=1760000000):
+    return {
+        "fixture": {"id": fid, "timestamp": timestamp, "status": {"short": "NS"}},
+        "league": {"name": liga, "country": pais},
+        "teams": {"home": {"name": local}, "away": {"name": visitante}},
+    }
+
+
+def test_from_api_skips_incomplete_records():
+    assert Fixture.from_api(crudo(1)).liga_pais == ("Liga Profesional Argentina", "Argentina")
+    assert Fixture.from_api({"fixture": {"id": 2}}) is None
+
+
+def test_table_dedupes_and_roundtrips(tmp_path):
+    tabla = FixtureTable()
+    tabla.extend([Fixture.from_api(crudo(1)), Fixture.from_api(crudo(2, pais=None, liga="Copa Libertadores")),
+                  Fixture.from_api(crudo(1, timestamp=1760003600))])
+    assert len(tabla) == 2
+    assert tabla.get(1).kickoff == 1760003600
+    assert tabla.get(2).pais is None
+
+    path = str(tmp_path / "fixtures.json")
+    tabla.save(path)
+    cargada = FixtureTable.load(path)
+    assert list(cargada) == list(tabla)
+    assert 2 in cargada and 3 not in cargada
+
+
+def test_formatear_uses_tenant_timezone():
+    fixture = Fixture.from_api(crudo(1, timestamp=1760050800))  # 2025-10-09 23:00 UTC
+    assert fixture.formatear().endswith("| 20:00 (ARG)")
+    assert fixture.formatear("America/New_York", "ET").endswith("| 19:00 (ET)")
@@ -0,0 +1,65 @@
+import os
+import sys
+import time
+import signal
+import subprocess
+
+import pytest
+
+from app.indexing import IndexLock, IndexLockedError, IndexStore
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_lock_is_exclusive(tmp_path):
+    path = str(tmp_path / ".indexing.lock")
+    with IndexLock(path):
+        otro = IndexLock(path)
+        assert otro.locked()
+        with pytest.raises(IndexLockedError):
+            otro.acquire()
+    assert not IndexLock(path).locked()
+    with IndexLock(path):
+        pass
+
+
+@pytest.mark.skipif(os.name != "posix", reason="usa SIGKILL")
+def test_lock_survives_long_builds_and_dies_with_owner(tmp_path):
+    path = str(tmp_path / ".indexing.lock")
+    proceso = subprocess.Popen(
+        [sys.executable, "-c",
+         "import sys, time; from app.indexing import IndexLock; "
+         "IndexLock(sys.argv[1]).acquire(); print('ok', flush=True); time.sleep(60)", path],
+        cwd=RAIZ, stdout=subprocess.PIPE, text=True
+    )
+    try:
+        assert proceso.stdout.readline().strip() == "ok"
+        lock = IndexLock(path)
+        # Sin importar la antigüedad, el lock de un proceso vivo no se toma
+        with pytest.raises(IndexLockedError):
+            lock.acquire()
+        assert lock._owner()["pid"] == proceso.pid
+    finally:
+        proceso.send_signal(signal.SIGKILL)
+        proceso.wait()
+    time.sleep(0.05)
+    with IndexLock(path):
+        pass
+
+
+def test_prune_keeps_current_and_last(tmp_path):
+    store = IndexStore(str(tmp_path))
+    for version in ("v1", "v2", "v3", "v4"):
+        os.makedirs(store.version_path(version))
+    store.publish("v2", documents=1)
+    assert store.prune(keep=1) == ["v1", "v3"]
+    assert store.versions() == ["v2", "v4"]
+
+
+def test_is_current_follows_the_published_dates(tmp_path):
+    store = IndexStore(str(tmp_path))
+    assert not store.is_current(["2025-10-09"])
+    os.makedirs(store.version_path("v1"))
+    store.publish("v1", documents=1, fechas=["2025-10-09", "2025-10-10"])
+    assert store.is_current(["2025-10-09"])
+    assert not store.is_current(["2025-10-10", "2025-10-11"])
@@ -0,0 +1,71 @@
+import time
+
+from app.live import LiveFixtureStore
+
+
+def partido(fid, home, away, estado="2H", minuto=60):
+    return {
+        "fixture": {"id": fid, "status": {"short": estado, "elapsed": minuto}},
+        "goals": {"home": home, "away": away}
+    }
+
+
+def test_generation_changes_only_on_new_data():
+    store = LiveFixtureStore()
+    store.update([partido(1, 0, 0)])
+    generation = store.generation
+    store.update([partido(1, 0, 0)])
+    assert store.generation == generation
+    store.update([partido(1, 1, 0)])
+    assert store.generation == generation + 1
+    assert store.get(1).formatear() == "🔴 EN VIVO 1-0 (60')"
+    assert store.in_play() == {1}
+
+
+def test_prune_drops_stale_entries():
+    store = LiveFixtureStore(max_age=60)
+    store.update([partido(1, 2, 1, estado="FT"), partido(2, 0, 0)])
+    store.get(1).actualizado = time.time() - 120
+    assert store.prune() == 1
+    assert store.get(1) is None
+    assert store.get(2) is not None
+
+
+def test_shared_file_between_writer_and_readers(tmp_path):
+    path = str(tmp_path / "live.json")
+    escritor = LiveFixtureStore(path)
+    lector = LiveFixtureStore(path, check_interval=0)
+    assert lector.get(7) is None
+
+    escritor.update([partido(7, 1, 1)])
+    escritor.save()
+    assert lector.get(7).formatear() == "🔴 EN VIVO 1-1 (60')"
+    assert lector.generation == escritor.generation
+
+    # Un poller que reinicia continúa la numeración de generaciones
+    assert LiveFixtureStore(path).generation == escritor.generation
+
+
+def test_answers_about_upcoming_matches_expire_with_the_live_ttl(crear_motor):
+    from app.fixtures import Fixture
+
+    ahora = int(time.time())
+    # Zona donde ahora es mediodía: los dos partidos caen en el mismo día local del tenant
+    desfase = 12 - time.gmtime(ahora).tm_hour
+    tenants = {"local": {"timezone": f"Etc/GMT{-desfase:+d}", "ligas": None}}
+    motor = crear_motor([
+        Fixture(1, ahora + 60, "Arsenal", "Chelsea", "Premier League", "England"),
+        Fixture(2, ahora + 3 * 3600, "Boca Juniors", "River Plate", "Liga Profesional Argentina", "Argentina"),
+    ], tenants=tenants, cache_ttl=3600, live_cache_ttl=1, max_results=1)
+    motor.generate_response = lambda context, question, tenant=None: context
+
+    antes = motor.query("Arsenal", tenant="local")
+    assert antes["live"] and "EN VIVO" not in antes["answer"]
+    # Lejos del inicio sí vale la caché completa
+    assert not motor.query("River Plate", tenant="local")["live"]
+
+    motor.live_store.update([partido(1, 1, 0)])
+    time.sleep(1.1)
+    despues = motor.query("Arsenal", tenant="local")
+    assert not despues["cache_hit"]
+    assert "🔴 EN VIVO 1-0 (60')" in despues["answer"]
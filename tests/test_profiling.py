@@ -0,0 +1,46 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.profiling import SamplingProfiler
+from app.streaming import iterar_array_json
+
+
+def trabajar(hasta: threading.Event):
+    """Mantiene el hilo dentro de código de app/ (el parser espera más datos)"""
+    def chunks():
+        while not hasta.is_set():
+            time.sleep(0.001)
+            yield b" "
+        yield b'{"response": []}'
+    return list(iterar_array_json(chunks(), "response"))
+
+
+def hilos(captura):
+    return {stack.split(";")[0] for stack in captura.stacks}
+
+
+def test_request_capture_only_samples_its_own_threads(tmp_path):
+    profiler = SamplingProfiler(str(tmp_path), interval=0.002)
+    fin = threading.Event()
+    ajeno = threading.Thread(target=trabajar, args=(fin,), name="ajeno")
+    ajeno.start()
+    try:
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="llm") as executor:
+            with profiler.capturar("ask") as captura:
+                hecho = threading.Event()
+                future = executor.submit(profiler.en_captura(trabajar), hecho)
+                time.sleep(0.2)
+                hecho.set()
+                future.result()
+            global_ = profiler.iniciar_global(60)
+            time.sleep(0.2)
+            profiler.detener(global_)
+    finally:
+        fin.set()
+        ajeno.join()
+
+    assert hilos(captura) == {"llm"}
+    assert captura.resumen(profiler.interval)["scope"] == "request"
+    assert "ajeno" in hilos(global_)
+    assert sorted(profiler.listar()) == sorted([captura.id, global_.id])
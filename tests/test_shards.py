@@ -0,0 +1,88 @@
+import os
+import socket
+import threading
+import time
+
+import numpy as np
+import pytest
+import requests
+from langchain_community.vectorstores import FAISS
+
+from app.indexing import IndexStore
+from app.shards import (SHARDS_DIR, ShardedVectorStore, ShardServer, ShardsUnavailableError, _SinModelo,
+                        clave_shard, leer_manifest, nombres_shards, particionar_indice)
+
+LIGAS = [("Premier League", "England"), ("La Liga", "Spain"), ("Copa Libertadores", None)]
+
+
+def puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = IndexStore(str(tmp_path))
+    pares, metadatas = [], []
+    for i, (liga, pais) in enumerate(LIGAS):
+        pares.append((f"partido de {liga}", np.full(4, float(i), dtype=np.float32)))
+        metadatas.append({"league": liga, "country": pais, "match_date": "2025-10-09"})
+    vector_store = FAISS.from_embeddings(pares, _SinModelo(), metadatas=metadatas)
+    path = store.version_path("v1")
+    particionar_indice(vector_store, os.path.join(path, SHARDS_DIR), por="league", num_shards=4)
+    store.publish("v1", documents=len(pares), shard_by="league")
+    return store
+
+
+def test_shard_names_do_not_depend_on_the_leagues_of_the_day():
+    metadata = {"league": "Premier League", "country": "England"}
+    assert clave_shard(metadata, "league", 4) == clave_shard(dict(metadata), "league", 4)
+    assert clave_shard(metadata, "league", 4) in nombres_shards("league", 4)
+    assert clave_shard({}, "league", 4) == "league-00"
+    assert clave_shard({"match_date": "2025-10-09"}, "season", 4) == "season-01"
+
+
+def test_manifest_lists_every_shard_even_empty(store):
+    manifest = leer_manifest(store.current_path())
+    assert sorted(manifest["shards"]) == nombres_shards("league", 4)
+    assert sum(manifest["shards"].values()) == len(LIGAS)
+
+
+def test_server_tells_empty_from_missing_shards(store):
+    manifest = leer_manifest(store.current_path())["shards"]
+    con_docs = next(nombre for nombre, n in manifest.items() if n)
+    resultados = ShardServer(store, con_docs).search([[0.0] * 4], k=3)
+    assert len(resultados[0]) == manifest[con_docs]
+    # Solo los días del tenant (match_date)
+    assert ShardServer(store, con_docs).search([[0.0] * 4], k=3, fechas={"2025-10-10"}) == [[]]
+
+    vacios = [nombre for nombre, n in manifest.items() if not n]
+    if vacios:
+        assert ShardServer(store, vacios[0]).search([[0.0] * 4], k=3) == [[]]
+    with pytest.raises(ShardsUnavailableError):
+        ShardServer(store, "league-07").search([[0.0] * 4], k=3)
+
+
+def test_client_flags_partial_results_and_raises_when_all_shards_fail(store):
+    manifest = leer_manifest(store.current_path())["shards"]
+    con_docs = next(nombre for nombre, n in manifest.items() if n)
+    port = puerto_libre()
+    threading.Thread(target=ShardServer(store, con_docs).serve, args=("127.0.0.1", port), daemon=True).start()
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            requests.get(f"{url}/health", timeout=0.5)
+            break
+        except requests.ConnectionError:
+            time.sleep(0.05)
+
+    caido = f"http://127.0.0.1:{puerto_libre()}"
+    resultados, completa = ShardedVectorStore([url, caido], timeout=1.0).search(np.zeros((1, 4)), k=3)
+    assert not completa
+    assert len(resultados[0]) == manifest[con_docs]
+
+    resultados, completa = ShardedVectorStore([url], timeout=1.0).search(np.zeros((1, 4)), k=3)
+    assert completa
+    with pytest.raises(ShardsUnavailableError):
+        ShardedVectorStore([caido], timeout=1.0).search(np.zeros((1, 4)), k=3)
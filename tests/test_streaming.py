@@ -0,0 +1,114 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import app.ingestion as ingestion
+from app.fixtures import Fixture
+from app.streaming import iterar_array_json
+
+
+def pedazos(data: bytes, tamano: int):
+    return (data[i:i + tamano] for i in range(0, len(data), tamano))
+
+
+PAYLOAD = {
+    "get": "fixtures",
+    "parameters": {"date": "2025-10-09"},
+    "errors": [],
+    "results": 3,
+    "response": [
+        {"fixture": {"id": 1}, "teams": {"home": {"name": "Atlético Tucumán"}}},
+        {"fixture": {"id": 2}, "goals": {"home": 10, "away": -1.5e3}},
+        {"fixture": {"id": 3}, "nota": "texto con \"comillas\", [corchetes] y {llaves} ⚽"},
+    ],
+    "paging": {"current": 1, "total": 1},
+}
+
+
+@pytest.mark.parametrize("tamano", [1, 2, 3, 7, 64, 100000])
+def test_parser_matches_json_loads_for_any_chunk_size(tamano):
+    data = json.dumps(PAYLOAD, ensure_ascii=False).encode("utf-8")
+    otros = {}
+    elementos = list(iterar_array_json(pedazos(data, tamano), "response", otros))
+    assert elementos == PAYLOAD["response"]
+    assert otros == {k: v for k, v in PAYLOAD.items() if k != "response"}
+
+
+def test_parser_yields_before_download_ends():
+    data = json.dumps(PAYLOAD).encode("utf-8")
+    leidos = []
+
+    def chunks():
+        for pedazo in pedazos(data, 16):
+            leidos.append(pedazo)
+            yield pedazo
+
+    primero = next(iterar_array_json(chunks(), "response"))
+    assert primero["fixture"]["id"] == 1
+    assert sum(map(len, leidos)) < len(data)
+
+
+@pytest.mark.parametrize("texto", [b'{"response": []}', b'{}', b' { "errors": {"x": 1} } '])
+def test_parser_empty_payloads(texto):
+    assert list(iterar_array_json([texto], "response")) == []
+
+
+def test_parser_rejects_truncated_payload():
+    data = json.dumps(PAYLOAD).encode("utf-8")[:-40]
+    with pytest.raises(ValueError):
+        list(iterar_array_json(pedazos(data, 10), "response"))
+
+
+def partidos_backfill(dias=30, ligas=3, por_dia=8):
+    inicio = datetime(2025, 10, 1, 18, 0, tzinfo=timezone.utc)  # 15:00 en Argentina
+    fid = 0
+    for dia in range(dias):
+        for liga in range(ligas):
+            for n in range(por_dia):
+                fid += 1
+                kickoff = inicio + timedelta(days=dia, minutes=10 * n)
+                yield Fixture(fid, int(kickoff.timestamp()), f"L{fid}", f"V{fid}", f"Liga {liga}", "Argentina")
+
+
+def test_chunks_flush_when_the_day_changes():
+    consumidos = []
+
+    def fuente():
+        for partido in partidos_backfill():
+            consumidos.append(partido)
+            yield partido
+
+    chunks = ingestion.iterar_chunks(fuente())
+    primero = next(chunks)
+    # El primer día se emite apenas llega un partido del segundo
+    assert len(consumidos) == 3 * 8 + 1
+    assert primero.metadata["match_date"] == "2025-10-01"
+    resto = list(chunks)
+    assert len(resto) + 1 == 30 * 3
+    assert sum(len(c.metadata["fixture_ids"]) for c in [primero, *resto]) == 720
+
+
+def test_chunks_split_big_groups_and_handle_empty_input():
+    chunks = list(ingestion.iterar_chunks(partidos_backfill(dias=1, ligas=1, por_dia=45)))
+    assert [len(c.metadata["fixture_ids"]) for c in chunks] == [20, 20, 5]
+    assert [c.page_content for c in ingestion.iterar_chunks([])] == ["No hay partidos relevantes programados hoy."]
+
+
+def test_day_errors_abort_ingestion(monkeypatch):
+    def iterar_partidos(fecha, ligas):
+        if fecha == "2025-10-02":
+            raise ConnectionError("corte a mitad de la descarga")
+        yield Fixture(1, 0, "A", "B", "Liga", None)
+
+    monkeypatch.setattr(ingestion, "iterar_partidos", iterar_partidos)
+    with pytest.raises(ConnectionError):
+        list(ingestion.iterar_partidos_fechas(["2025-10-01", "2025-10-02", "2025-10-03"]))
+
+
+def test_dates_cover_each_tenant_local_day():
+    assert ingestion.fechas_por_zonas([ingestion.TZ_ARG], desde="2025-10-09") == ["2025-10-09"]
+    # Nueva York (UTC-4) termina su día a la 01:00 de Argentina; Madrid (UTC+2) lo empieza a las 19:00
+    assert ingestion.fechas_por_zonas(["America/New_York"], desde="2025-10-09") == ["2025-10-09", "2025-10-10"]
+    assert ingestion.fechas_por_zonas(["Europe/Madrid", ingestion.TZ_ARG], dias=2, desde="2025-10-09") == \
+        ["2025-10-08", "2025-10-09", "2025-10-10"]
@@ -0,0 +1,32 @@
+import pytest
+
+from conftest import partido
+
+pytestmark = pytest.mark.usefixtures("dia_fijo")
+
+TENANTS = {"tokio": {"timezone": "Asia/Tokyo", "etiqueta_hora": "JST", "idioma": "es"}}
+
+PARTIDOS = [
+    # 9/10 20:00 ARG = 10/10 08:00 en Tokio: solo es "hoy" para ar
+    partido(1, "Arsenal", "Chelsea", "2025-10-09 20:00"),
+    # 9/10 01:00 ARG = 9/10 13:00 en Tokio: hoy para los dos (mismo chunk que Arsenal)
+    partido(2, "Tottenham", "Fulham", "2025-10-09 01:00"),
+    # 9/10 10:00 en Tokio = 8/10 22:00 ARG: solo es "hoy" para tokio
+    partido(3, "Liverpool", "Everton", "2025-10-09 10:00", tz="Asia/Tokyo"),
+]
+
+
+def test_context_only_has_matches_of_the_tenant_local_day(crear_motor):
+    motor = crear_motor(PARTIDOS, tenants=TENANTS)
+    motor.generate_response = lambda context, question, tenant=None: context
+
+    for resultado in (motor.query("Premier League"),
+                      dict(motor.query_many(["Premier League"], use_cache=False))[0]):
+        assert "Arsenal" in resultado["answer"] and "Tottenham" in resultado["answer"]
+        assert "Liverpool" not in resultado["answer"]
+
+    for resultado in (motor.query("Premier League", tenant="tokio"),
+                      dict(motor.query_many(["Premier League"], use_cache=False, tenant="tokio"))[0]):
+        assert "Liverpool" in resultado["answer"] and "Tottenham" in resultado["answer"]
+        assert "Arsenal" not in resultado["answer"]
+        assert "13:00 (JST)" in resultado["answer"]
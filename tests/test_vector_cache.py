@@ -0,0 +1,68 @@
+import numpy as np
+
+from app.vector_cache import CachedEmbeddings, VectorCache
+
+
+def vec(x):
+    return [float(x), float(x) + 0.5]
+
+
+def test_roundtrip_and_lru(tmp_path):
+    cache = VectorCache(str(tmp_path), "modelo", capacity=2)
+    cache.put_many(["a", "b"], [vec(1), vec(2)])
+    assert cache.get_many(["a"])[0].tolist() == vec(1)  # "b" queda como la menos usada
+    cache.put_many(["c"], [vec(3)])
+    a, b, c = cache.get_many(["a", "b", "c"])
+    assert a.tolist() == vec(1) and b is None and c.tolist() == vec(3)
+
+    cache.save()
+    otra = VectorCache(str(tmp_path), "modelo", capacity=2)
+    assert len(otra) == 2
+    assert VectorCache(str(tmp_path), "otro-modelo", capacity=2).get_many(["a"]) == [None]
+
+
+def test_recycled_slot_without_save_is_not_served(tmp_path):
+    cache = VectorCache(str(tmp_path), "modelo", capacity=2)
+    cache.put_many(["a", "b"], [vec(1), vec(2)])
+    cache.save()
+    cache.put_many(["c"], [vec(3)])  # recicla el slot de "a"; el build se corta sin save()
+
+    recargada = VectorCache(str(tmp_path), "modelo", capacity=2)
+    a, b, c = recargada.get_many(["a", "b", "c"])
+    assert a is None
+    assert b.tolist() == vec(2)
+    assert c is None
+
+
+def test_stale_index_is_caught_by_slot_stamp(tmp_path):
+    cache = VectorCache(str(tmp_path), "modelo", capacity=2)
+    cache.put_many(["a"], [vec(1)])
+    cache.save()
+    # Otro slot escrito por encima sin que el índice lo sepa
+    slot = cache._slots[cache.key("a")][0]
+    cache._vectors[slot] = vec(9)
+    cache._stamps[slot] = np.frombuffer(bytes.fromhex(cache.key("z")), dtype=np.uint8)
+    cache._vectors.flush()
+    cache._stamps.flush()
+
+    assert VectorCache(str(tmp_path), "modelo", capacity=2).get_many(["a"]) == [None]
+
+
+class Contador:
+    def __init__(self):
+        self.textos = []
+
+    def embed_documents(self, texts):
+        self.textos.extend(texts)
+        return [vec(len(t)) for t in texts]
+
+    def embed_query(self, text):
+        return vec(len(text))
+
+
+def test_cached_embeddings_only_encodes_missing_texts(tmp_path):
+    base = Contador()
+    embeddings = CachedEmbeddings(base, VectorCache(str(tmp_path), "modelo"))
+    assert embeddings.embed_documents(["aa", "b", "aa"]) == [vec(2), vec(1), vec(2)]
+    assert embeddings.embed_documents(["b", "ccc"]) == [vec(1), vec(3)]
+    assert base.textos == ["aa", "b", "ccc"]